@@ -1,13 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+import json
 import os
-import re
-from glob import glob
-import subprocess
+import threading
+
+from backend.audio_io import probe_wav_file
+from backend.jobs import JobQueue, QueueFull
+from backend.recordings import RecordingStore
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend requests
 
+# Larger request bodies are refused with 413 before they are read
+app.config['MAX_CONTENT_LENGTH'] = int(float(os.getenv('SPEAKEASY_MAX_UPLOAD_MB', '64')) * 1024 * 1024)
+
 # Get the project root directory (parent of backend)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 AUDIO_TESTS_DIR = os.path.join(PROJECT_ROOT, 'audiotests')
@@ -15,157 +22,351 @@ AUDIO_TESTS_DIR = os.path.join(PROJECT_ROOT, 'audiotests')
 # Ensure audiotests directory exists
 os.makedirs(AUDIO_TESTS_DIR, exist_ok=True)
 
-def get_next_recording_number():
-    """Find the highest existing recording number and return the next one."""
-    pattern = os.path.join(AUDIO_TESTS_DIR, 'user_recording_#*.wav')
-    existing_files = glob(pattern)
-    
-    max_number = 0
-    for filepath in existing_files:
-        filename = os.path.basename(filepath)
-        # Extract number from filename like "user_recording_#1.wav"
-        match = re.search(r'user_recording_#(\d+)\.wav', filename)
-        if match:
-            number = int(match.group(1))
-            max_number = max(max_number, number)
-    
-    return max_number + 1
+# Recording ids and metadata live in an index next to the audio files
+recordings = RecordingStore(os.path.join(AUDIO_TESTS_DIR, 'recordings.db'), AUDIO_TESTS_DIR)
+
+# Uploads are processed in the background; clients poll /api/jobs/<id> or follow its event stream
+# Admission control: past max_pending queued/running jobs, uploads get 503 with a Retry-After estimate
+job_queue = JobQueue(
+    max_workers=int(os.getenv('SPEAKEASY_JOB_WORKERS', '4')),
+    max_pending=int(os.getenv('SPEAKEASY_MAX_PENDING_JOBS', '32')) or None,
+)
+# Upload bodies being received at once; the rest get 429 so a burst cannot hold every request thread
+upload_slots = threading.BoundedSemaphore(int(os.getenv('SPEAKEASY_MAX_CONCURRENT_UPLOADS', '8')))
+SSE_KEEPALIVE_SEC = 15
+# Longest a ?wait=1 upload holds its request thread; after that it gets the usual 202 job payload
+UPLOAD_WAIT_TIMEOUT_SEC = float(os.getenv('SPEAKEASY_UPLOAD_WAIT_SEC', '120'))
+
+def sse_event(name: str, payload, event_id=None):
+    """Format one server-sent event."""
+    prefix = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{prefix}event: {name}\ndata: {json.dumps(payload)}\n\n'
+
+def process_upload(job, filepath: str, recording_id: int, frames=(), question=None):
+    """
+    Background work for an upload: prosody, transcription and video analysis run at once
+    (see backend.orchestrator); each result is published as it lands, then the feedback streams.
+    """
+    from backend.orchestrator import Session, get_orchestrator
+    from backend.stt_llm_tts import transcript_key
+
+    # The request thread only streamed the upload to disk; the audio is loaded here, once a worker is free
+    with open(filepath, 'rb') as f:
+        audio_bytes = f.read()
+
+    def on_event(event, **fields):
+        if event == 'feedback_delta':
+            job.emit(event, **fields)
+            return
+        if event == 'transcript':
+            recordings.update(recording_id, transcript=fields['transcript'], transcript_id=transcript_key(audio_bytes))
+        elif event == 'feedback':
+            recordings.update(recording_id, feedback=fields['feedback'])
+        job.publish(event, **fields)
+
+    session = Session(audio_bytes, frames=list(frames), question=question)
+    result = get_orchestrator().run(session, on_event=on_event)
+    # Save what was measured before failing the job, so a late LLM error does not lose the analysis
+    analysis = {key: result[key] for key in ('speech', 'prosody', 'video', 'timings', 'errors') if result[key]}
+    recordings.update(recording_id, analysis=analysis)
+    if not result['transcript']:
+        job.fail('Transcription failed')
+    elif result['feedback'] is None:
+        job.fail(f"Feedback failed: {result['errors'].get('feedback', 'unknown error')}")
+
+def overloaded(status: int, message: str, retry_after_sec: int):
+    response = jsonify({'error': message, 'retry_after_sec': retry_after_sec})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after_sec)
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    return jsonify({'error': f'Request body is larger than {limit_mb:.0f} MB'}), 413
 
 @app.route('/api/upload-audio', methods=['POST'])
 def upload_audio():
+    # Admission control runs before the body is read, so a rejected upload costs almost nothing
+    if job_queue.full():
+        return overloaded(503, 'Server is busy analyzing other recordings', job_queue.retry_after_sec())
+    if not upload_slots.acquire(blocking=False):
+        return overloaded(429, 'Too many uploads in progress', 1)
     try:
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
-        
-        audio_file = request.files['audio']
-        
-        if audio_file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        # Generate filename with sequential number
-        next_number = get_next_recording_number()
-        filename = f'user_recording_#{next_number}.wav'
-        filepath = os.path.join(AUDIO_TESTS_DIR, filename)
-        
-        # Save the file
-        audio_file.save(filepath)
-        
-        # Get transcript and feedback using stt_llm_tts.get_feedback
-        transcript = None
-        feedback = None
-        try:
-            from backend.stt_llm_tts import get_feedback
-            
-            # Relative path from project root
-            relative_path = os.path.relpath(filepath, PROJECT_ROOT)
-            result = get_feedback(relative_path)
-            
-            if result and isinstance(result, list) and len(result) >= 2:
-                transcript = result[0]
-                feedback = result[1]
-            else:
-                # Fallback: just get transcript if get_feedback doesn't work as expected
-                transcript = result[0] if result and len(result) > 0 else None
-        except Exception as e:
-            print(f'Error getting feedback: {e}')
-            # Try to at least get transcript
-            try:
-                transcript = transcribe_audio_file(filepath)
-            except Exception as e2:
-                print(f'Error transcribing audio: {e2}')
-        
+        return receive_upload()
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def receive_upload():
+    """Save the upload and queue its analysis; the upload slot is held only until the body is on disk."""
+    try:
+        recording, job, error = save_upload()
+    finally:
+        upload_slots.release()
+    if error is not None:
+        return error
+    filename = recording['filename']
+    filepath = recording['filepath']
+    
+    # ?wait=1 keeps the old blocking behaviour for scripts that expect the full result,
+    # up to a timeout so a stuck job cannot hold a server thread forever
+    if request.args.get('wait') in ('1', 'true') and job.wait(timeout=UPLOAD_WAIT_TIMEOUT_SEC):
+        snapshot = job.snapshot()
         return jsonify({
             'success': True,
+            'job_id': job.id,
+            'recording_id': recording['id'],
             'filename': filename,
             'filepath': filepath,
             'message': f'Audio saved to {filepath}',
-            'transcript': transcript,
-            'feedback': feedback
+            'transcript': snapshot['transcript'],
+            'feedback': snapshot['feedback'],
+            'prosody': snapshot.get('prosody'),
+            'video': snapshot.get('video'),
+            'timings': snapshot.get('timings'),
+            'error': snapshot['error'],
         }), 200
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.id}',
+        'events_url': f'/api/jobs/{job.id}/events',
+        'recording_id': recording['id'],
+        'filename': filename,
+        'filepath': filepath,
+        'message': f'Audio saved to {filepath}',
+    }), 202
 
-def transcribe_audio_file(file_path: str):
-    """Transcribe audio file using stt_llm_tts.get_transcript."""
+def save_upload():
+    """Stream the audio to its recording file and submit the analysis job: (recording, job, error response or None)."""
+    if 'audio' not in request.files:
+        return None, None, (jsonify({'error': 'No audio file provided'}), 400)
+    
+    audio_file = request.files['audio']
+    
+    if audio_file.filename == '':
+        return None, None, (jsonify({'error': 'No file selected'}), 400)
+    
+    # Allocate the next sequential recording number atomically
+    recording = recordings.allocate()
+    filename = recording['filename']
+    filepath = recording['filepath']
+    
+    # The form parser spools large files to a temporary file; copy it across in chunks, never all in memory
+    audio_file.save(filepath)
+    
+    # Optional JPEG frames of the speaker for body-language analysis
+    frames = [frame.read() for frame in request.files.getlist('frames')]
+    question = request.form.get('question') or None
+    
+    # Analysis and feedback run on the job queue; the client follows the job
     try:
-        # Use subprocess to call modal run, which will output logs + transcript
-        relative_path = os.path.relpath(file_path, PROJECT_ROOT)
-        result = subprocess.run(
-            ['python', '-m', 'modal', 'run', 'backend.modal_parakeet', '--file-path', relative_path],
-            cwd=PROJECT_ROOT,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
+        job = job_queue.submit(
+            'upload-audio',
+            lambda job: process_upload(job, filepath, recording['id'], frames, question),
+            recording_id=recording['id'],
+            filename=filename,
+            filepath=filepath,
+            transcript=None,
+            feedback=None,
         )
-        
-        if result.returncode == 0:
-            # Parse output to extract just the transcript text
-            # The transcript is printed after all Modal logs
-            output_lines = result.stdout.strip().split('\n')
-            
-            # Find the line after "Stopping app - local entrypoint completed."
-            # or after "✓ App completed" - that should be the transcript
-            transcript = None
-            found_completion = False
-            
-            for i, line in enumerate(output_lines):
-                line = line.strip()
-                # Look for completion markers
-                if 'Stopping app' in line and 'local entrypoint completed' in line:
-                    found_completion = True
-                    # The transcript should be on the next non-empty line
-                    for j in range(i + 1, len(output_lines)):
-                        next_line = output_lines[j].strip()
-                        if next_line and not next_line.startswith('✓'):
-                            transcript = next_line
-                            break
-                    break
-                elif line.startswith('✓ App completed'):
-                    found_completion = True
-                    # The transcript should be on the next non-empty line
-                    for j in range(i + 1, len(output_lines)):
-                        next_line = output_lines[j].strip()
-                        if next_line:
-                            transcript = next_line
-                            break
-                    break
-            
-            # If we didn't find completion marker, look for the last line that's not a Modal log
-            if not transcript:
-                for line in reversed(output_lines):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    # Skip Modal-specific lines
-                    if (line.startswith('✓') or line.startswith('├──') or line.startswith('└──') or
-                        line.startswith('╭') or line.startswith('╰') or line.startswith('│') or
-                        'Modal' in line or 'View run at' in line or 'Initialized' in line or
-                        'Created' in line or '/usr/local' in line or 'site-packages' in line or
-                        'Warning' in line or 'Deprecation' in line or 'Device set to' in line or
-                        'Stopping app' in line or 'FutureWarning' in line or 'warnings.warn' in line or
-                        'bug fix' in line or 'multilingual Whisper' in line or
-                        'Passing a tuple' in line or 'EncoderDecoderCache' in line):
-                        continue
-                    # This should be the transcript
-                    transcript = line
-                    break
-            
-            return transcript if transcript else None
-        else:
-            print(f'Transcription error: {result.stderr}')
-            return None
-    except subprocess.TimeoutExpired:
+    except QueueFull as e:
+        # Filled up while this body was being received
+        recordings.delete(recording['id'])
+        return None, None, overloaded(503, 'Server is busy analyzing other recordings', e.retry_after_sec)
+    
+    info = probe_wav_file(filepath) or {}
+    recordings.update(
+        recording['id'],
+        duration_sec=info.get('duration_sec'),
+        sample_rate=info.get('sample_rate'),
+        job_id=job.id,
+    )
+    return recording, job, None
+
+@app.route('/api/recordings', methods=['GET'])
+def list_recordings():
+    # type=int returns the default both when the key is absent and when conversion fails, so a bad value
+    # can only be told apart by checking that the key is present and converts to None without a default
+    if any(key in request.args and request.args.get(key, type=int) is None for key in ('limit', 'offset')):
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 0), 500)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return jsonify({'recordings': recordings.list(limit=limit, offset=offset)}), 200
+
+@app.route('/api/recordings/<int:recording_id>', methods=['GET'])
+def get_recording(recording_id):
+    recording = recordings.get(recording_id)
+    if recording is None:
+        return jsonify({'error': 'Recording not found'}), 404
+    return jsonify(recording), 200
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.snapshot()), 200
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events for a job: status, transcript, feedback, error and done."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # EventSource resends the last id it saw when it reconnects
+    try:
+        last_seen = max(0, int(request.headers.get('Last-Event-ID') or request.args.get('after') or 0))
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID and after must be integers'}), 400
+    
+    def stream():
+        seq = last_seen
+        while True:
+            events = job.events_after(seq, timeout=SSE_KEEPALIVE_SEC)
+            if not events:
+                if job.finished:
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            for seq, name, payload in events:
+                yield sse_event(name, payload, event_id=seq)
+            if job.finished and seq == job.last_seq:
+                return
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+def transcribe_audio_file(file_path: str):
+    """Transcribe audio file using the shared in-process transcription client."""
+    try:
+        from concurrent.futures import TimeoutError
+        from backend.transcription import get_client
+
+        result = get_client().transcribe_file(file_path, timeout=300)  # 5 minute timeout
+        return result.text if result.text else None
+    except TimeoutError:
         print('Transcription timed out')
         return None
     except Exception as e:
         print(f'Error transcribing audio: {e}')
         return None
 
+@app.route('/api/feedback/stream', methods=['POST'])
+def stream_feedback():
+    """Stream LLM feedback for a transcript as server-sent 'token' events, then 'done' with timing metrics."""
+    body = request.get_json(silent=True) or {}
+    transcript = body.get('transcript')
+    if not transcript:
+        return jsonify({'error': 'No transcript provided'}), 400
+    
+    from backend.stt_llm_tts import stream_feedback_from_transcript
+    
+    def stream():
+        metrics = {}
+        try:
+            for delta in stream_feedback_from_transcript(transcript, metrics=metrics):
+                yield sse_event('token', {'text': delta})
+        except Exception as e:
+            print(f'Error streaming feedback: {e}')
+            yield sse_event('error', {'error': str(e)})
+            return
+        yield sse_event('done', metrics)
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/api/feedback/metrics', methods=['GET'])
+def feedback_metrics():
+    """Time-to-first-token and tokens/sec of recent streamed feedback requests."""
+    from backend.stt_llm_tts import FEEDBACK_STREAM_METRICS
+    
+    recent = [m for m in FEEDBACK_STREAM_METRICS if not m.get('cached')]
+    ttfts = [m['ttft_sec'] for m in recent if m.get('ttft_sec') is not None]
+    rates = [m['tokens_per_sec'] for m in recent if m.get('tokens_per_sec') is not None]
+    return jsonify({
+        'requests': len(recent),
+        'mean_ttft_sec': sum(ttfts) / len(ttfts) if ttfts else None,
+        'mean_tokens_per_sec': sum(rates) / len(rates) if rates else None,
+        'recent': list(FEEDBACK_STREAM_METRICS)[-20:],
+    }), 200
+
+@app.route('/api/tts/stream', methods=['POST'])
+def stream_tts():
+    """Speak text as a chunked audio response, one sentence at a time, so playback starts after the first sentence."""
+    body = request.get_json(silent=True) or {}
+    text = body.get('text')
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    from backend.tts import DEFAULT_OUTPUT_FORMAT, get_engine, output_mimetype
+    
+    options = {key: body[key] for key in ('voice_id', 'model_id', 'voice_settings') if body.get(key)}
+    output_format = body.get('output_format') or DEFAULT_OUTPUT_FORMAT
+    
+    def stream():
+        metrics = {}
+        try:
+            yield from get_engine().stream(text, output_format=output_format, metrics=metrics, **options)
+        except Exception as e:
+            # Headers are already sent; ending the body early is all that is left to do
+            print(f'Error streaming speech: {e}')
+        print(f"TTS: {metrics.get('sentences')} sentences, first audio after {metrics.get('ttfa_sec') or 0:.2f}s, "
+              f"{metrics.get('cache_hits')} from cache")
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype=output_mimetype(output_format),
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    from backend.cache import cache_stats
+    from backend.tts import get_engine
+
+    stats = cache_stats()
+    tts_cache = get_engine().cache
+    if tts_cache is not None:
+        stats['tts_phrases'] = tts_cache.stats()
+    return jsonify(stats), 200
+
+@app.route('/api/http/stats', methods=['GET'])
+def get_http_stats():
+    """Calls, retries, hedges and in-flight requests per external service (see http_clients)."""
+    from backend.http_clients import service_stats
+
+    return jsonify(service_stats()), 200
+
+@app.route('/api/startup', methods=['GET'])
+def get_startup():
+    """Warm-up state and how long each preload step took (see backend.startup)."""
+    from backend.startup import warmup_report
+
+    return jsonify(warmup_report()), 200
+
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'}), 200
+    """'busy' while new uploads would be turned away; the job queue counters say how close it is."""
+    return jsonify({'status': 'busy' if job_queue.full() else 'ok', 'jobs': job_queue.stats()}), 200
 
 if __name__ == '__main__':
+    # Development server; production runs under gunicorn with `python -m backend.serve`
+    from backend.startup import start_warmup
+
+    # With the reloader, only the child process that actually serves should warm up
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup('127.0.0.1', 5000)
     app.run(debug=True, port=5000)
 
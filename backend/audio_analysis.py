@@ -1,49 +1,93 @@
-
-import parselmouth
-import librosa
 import numpy as np
-from pydub import AudioSegment
 
-def analyze_speech(wav_file):
-    # ----- Load audio -----
-    y, sr = librosa.load(wav_file, sr=None)  # y = waveform, sr = sample rate
-    duration_sec = librosa.get_duration(y=y, sr=sr)
+from backend.audio_io import load_audio
+from backend.vad import detect_speech
+
+def compute_metrics(wav_file, speech=None):
+    """
+    Compute the raw prosody metrics for a recording.
+
+    Args:
+        wav_file: Path to a WAV file, or a DecodedAudio that was already loaded
+        speech: SpeechSegments from backend.vad if the caller already ran it
+
+    Returns:
+        Dict with duration, pitch, loudness, speech rate and pause measurements. The pitch
+        fields are None when no frame is voiced and loudness_db is None on digital silence,
+        so the dict is always valid JSON.
+    """
+    # Imported here, not at module level: librosa alone takes seconds, and assess()
+    # (used by live_prosody) needs neither
+    import librosa
+    import parselmouth
+
+    # ----- Load audio (decoded once, shared by every stage below) -----
+    audio = load_audio(wav_file)
+    y_full, sr = audio.samples, audio.sample_rate  # float32 waveform in [-1, 1], sr = sample rate
+    duration_sec = audio.duration_sec
+    
+    # ----- Voice activity: measure the speech, not the silence around it -----
+    speech = speech or detect_speech(y_full, sr)
+    span_start, span_end = speech.span
+    y = y_full[span_start:span_end]  # first word to last word (a view, no copy)
+    speaking_sec = max(speech.span_sec, 1e-6)
+    speech_sec = max(speech.speech_sec, 1e-6) if speech.segments else speaking_sec
     
     # ----- Pitch analysis using parselmouth -----
-    snd = parselmouth.Sound(wav_file)
+    snd = parselmouth.Sound(y.astype(np.float64), sampling_frequency=sr)
     pitch = snd.to_pitch()
     pitch_values = pitch.selected_array['frequency']
     pitch_values = pitch_values[(pitch_values > 50) & (pitch_values < 500)]  # remove unvoiced parts
     
-    pitch_mean = np.mean(pitch_values)
-    pitch_sd = np.std(pitch_values)
-    
-    # Convert pitch SD to semitones relative to mean
-    pitch_sd_st = 12 * np.log2(pitch_values / pitch_mean)
-    pitch_sd_st = np.std(pitch_sd_st)
+    if pitch_values.size:
+        pitch_mean = np.mean(pitch_values)
+        pitch_sd = np.std(pitch_values)
+        # Convert pitch SD to semitones relative to mean
+        pitch_sd_st = np.std(12 * np.log2(pitch_values / pitch_mean))
+    else:
+        pitch_mean = pitch_sd = pitch_sd_st = None  # silent or unvoiced: there is no pitch to measure
     
-    # ----- Loudness (RMS in dB) using pydub -----
-    audio = AudioSegment.from_wav(wav_file)
-    loudness_db = audio.dBFS  # average loudness
+    # ----- Loudness (RMS in dB) over speech segments only -----
+    voiced = np.concatenate([y_full[start:end] for start, end in speech.segments]) if speech.segments else y
+    rms = np.sqrt(np.mean(np.square(voiced, dtype=np.float64))) if voiced.size else 0.0
+    loudness_db = 20 * np.log10(rms) if rms > 0 else None  # average loudness in dBFS; None on digital silence
     # approximate SD using samples
-    samples = np.array(audio.get_array_of_samples())
-    samples = samples / (2**15)  # normalize 16-bit PCM
-    loudness_sd = 20 * np.log10(np.std(samples) + 1e-6)
+    loudness_sd = 20 * np.log10(np.std(voiced) + 1e-6)
     
     # ----- Speech rate (WPM) approximation -----
     # Using librosa to detect syllable-like events via onset detection
     onset_env = librosa.onset.onset_strength(y=y, sr=sr)
     onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr)
     syllable_count = len(onsets)
-    words_per_minute = (syllable_count / 2.0) / (duration_sec / 60)  # approx 1.5 syllables per word
+    # Speaking rate runs from the first to the last word; articulation rate excludes the pauses too
+    words_per_minute = (syllable_count / 2.0) / (speaking_sec / 60)  # approx 1.5 syllables per word
+    articulation_rate = syllable_count / speech_sec  # syllables per second of actual speech
     
     # ----- Results -----
     # print(f"Duration: {duration_sec:.2f} sec")
     # print(f"Pitch: mean = {pitch_mean:.2f} Hz, SD = {pitch_sd:.2f} Hz, SD (semitones) = {pitch_sd_st:.2f} st")
     # print(f"Loudness: mean = {loudness_db:.2f} dBFS, SD ~ {loudness_sd:.2f} dB")
     # print(f"Approx. speech rate: {words_per_minute:.2f} WPM")
+    def optional(value):
+        return None if value is None else float(value)
+
+    return {
+        "duration_sec": float(duration_sec),
+        "pitch_mean": optional(pitch_mean),
+        "pitch_sd": optional(pitch_sd),
+        "pitch_sd_st": optional(pitch_sd_st),
+        "loudness_db": optional(loudness_db),
+        "loudness_sd": float(loudness_sd),
+        "words_per_minute": float(words_per_minute),
+        "articulation_rate": float(articulation_rate),
+        **speech.stats(),
+    }
 
-    if pitch_sd_st < 1:
+def assess(pitch_sd_st, words_per_minute, loudness_db):
+    """Turn prosody metrics into the coaching sentence shown to the user. Metrics that are None are left out."""
+    if pitch_sd_st is None:
+        pitch_assessment = None
+    elif pitch_sd_st < 1:
         pitch_assessment = "are too monotone"
     elif pitch_sd_st > 5:
         pitch_assessment = "are overly dramatic"
@@ -51,7 +95,9 @@ def analyze_speech(wav_file):
         pitch_assessment = "have good pitch variation"
 
     # Speech rate
-    if words_per_minute < 150:
+    if words_per_minute is None:
+        rate_assessment = None
+    elif words_per_minute < 150:
         rate_assessment = "too slowly"
     elif words_per_minute > 200:
         rate_assessment = "too fast"
@@ -59,20 +105,33 @@ def analyze_speech(wav_file):
         rate_assessment = "at a good pace"
 
     # Loudness
-    if loudness_db < -25:
+    if loudness_db is None:
+        loudness_assessment = None
+    elif loudness_db < -25:
         loudness_assessment = "too quiet"
     elif loudness_db > -5:
         loudness_assessment = "too loud"
     else:
         loudness_assessment = "speaking at a good volume"
 
-    # ----- Results -----
-    # print(f"Duration: {duration_sec:.2f} sec")
-    # if()
-    # print(f"Pitch: mean = {pitch_mean:.2f} Hz, SD = {pitch_sd:.2f} Hz, SD (semitones) = {pitch_sd_st:.2f} st ({pitch_assessment})")
-    # print(f"Loudness: mean = {loudness_db:.2f} dB, SD = {loudness_sd:.2f} dB ({loudness_assessment})")
-    # print(f"Approx. speech rate: {words_per_minute:.2f} WPM ({rate_assessment})")
-    return f"Based on your speech, you {pitch_assessment}. Also, you are speaking {rate_assessment} and you are {loudness_assessment}."
+    clauses = []
+    if rate_assessment:
+        clauses.append(f"you are speaking {rate_assessment}")
+    if loudness_assessment:
+        clauses.append(f"you are {loudness_assessment}")
+    delivery = " and ".join(clauses)
+
+    if pitch_assessment and delivery:
+        return f"Based on your speech, you {pitch_assessment}. Also, {delivery}."
+    if pitch_assessment:
+        return f"Based on your speech, you {pitch_assessment}."
+    if delivery:
+        return f"Based on your speech, {delivery}."
+    return "There was not enough speech to assess your delivery."
+
+def analyze_speech(wav_file):
+    metrics = compute_metrics(wav_file)
+    return assess(metrics["pitch_sd_st"], metrics["words_per_minute"], metrics["loudness_db"])
 
 # Example usage
-# analyze_speech("./audiotests/recording_with_issues.wav")
\ No newline at end of file
+# analyze_speech("./audiotests/recording_with_issues.wav")
@@ -0,0 +1,223 @@
+"""
+Decode audio once and share the samples between analysis stages.
+
+Everything downstream (pitch, loudness, onsets) works on one mono float32
+buffer in [-1, 1], so a WAV upload is read from disk a single time.
+"""
+import io
+import os
+import struct
+import wave
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class DecodedAudio:
+    """Mono float32 samples in [-1, 1] and their sample rate."""
+    samples: np.ndarray
+    sample_rate: int
+
+    @property
+    def duration_sec(self) -> float:
+        return len(self.samples) / float(self.sample_rate)
+
+
+def _read_wav_layout(f):
+    """
+    Walk the RIFF chunks of an open WAV file.
+
+    Returns (format_tag, channels, sample_rate, bits_per_sample, data_offset, data_size)
+    or None if the file is not a plain RIFF/WAVE file.
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            body = f.read(chunk_size)
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # The real format tag is the first two bytes of the SubFormat GUID
+                format_tag = struct.unpack("<H", body[24:26])[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            return fmt + (f.tell(), chunk_size)
+        else:
+            f.seek(chunk_size, os.SEEK_CUR)
+        if chunk_size % 2:
+            f.seek(1, os.SEEK_CUR)  # chunks are word aligned
+
+
+def _to_mono_float32(raw: np.ndarray, scale: float) -> np.ndarray:
+    """Down-mix (frames, channels) integer/float samples into one float32 buffer."""
+    if raw.shape[1] == 1:
+        samples = raw[:, 0].astype(np.float32)
+    else:
+        samples = raw.mean(axis=1, dtype=np.float32)
+    if scale != 1.0:
+        samples *= np.float32(scale)
+    return samples
+
+
+def _sample_format(format_tag: int, bits: int):
+    """(dtype, scale to [-1, 1]) for the WAV encodings read without soundfile, else None."""
+    if format_tag == WAVE_FORMAT_PCM and bits == 16:
+        return np.dtype("<i2"), 1.0 / 32768.0
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return np.dtype("<f4"), 1.0
+    return None
+
+
+def _load_wav_mmap(path: str):
+    """Memory-map the data chunk of a PCM16/float32 WAV. Returns None if unsupported."""
+    with open(path, "rb") as f:
+        layout = _read_wav_layout(f)
+    if layout is None:
+        return None
+
+    format_tag, channels, sample_rate, bits, data_offset, data_size = layout
+    sample_format = _sample_format(format_tag, bits)
+    if sample_format is None:
+        return None
+    dtype, scale = sample_format
+
+    # Some recorders leave the data size at 0 or larger than the file; trust the file length
+    available = os.path.getsize(path) - data_offset
+    if data_size == 0 or data_size > available:
+        data_size = available
+    n_frames = data_size // (dtype.itemsize * channels)
+    if n_frames == 0:
+        return DecodedAudio(np.zeros(0, dtype=np.float32), sample_rate)
+
+    raw = np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=(n_frames, channels))
+    try:
+        samples = _to_mono_float32(raw, scale)
+    finally:
+        del raw
+    return DecodedAudio(samples, sample_rate)
+
+
+def load_audio(source, mmap: bool = True) -> DecodedAudio:
+    """
+    Decode an audio file into a DecodedAudio.
+
+    Args:
+        source: Path to an audio file, or an already decoded DecodedAudio (returned as is)
+        mmap: Memory-map PCM16/float32 WAV files instead of reading them through soundfile
+
+    Returns:
+        DecodedAudio with mono float32 samples
+    """
+    if isinstance(source, DecodedAudio):
+        return source
+
+    path = os.fspath(source)
+    if mmap:
+        decoded = _load_wav_mmap(path)
+        if decoded is not None:
+            return decoded
+
+    import soundfile as sf
+
+    raw, sample_rate = sf.read(path, dtype="float32", always_2d=True)
+    return DecodedAudio(_to_mono_float32(raw, 1.0), sample_rate)
+
+
+def decode_audio_bytes(data: bytes, sample_rate: Optional[int] = None, channels: int = 1) -> DecodedAudio:
+    """
+    Decode audio held in memory without touching the filesystem.
+
+    Args:
+        data: WAV file bytes, or raw little-endian int16 PCM when sample_rate is given
+        sample_rate: Sample rate of raw PCM input (ignored for WAV, which carries its own)
+        channels: Interleaved channel count of raw PCM input
+
+    Returns:
+        DecodedAudio with mono float32 samples
+    """
+    if not isinstance(data, bytes):
+        data = bytes(data)  # BytesIO and frombuffer share a bytes object instead of copying it
+    if data[:4] == b"RIFF":
+        layout = _read_wav_layout(io.BytesIO(data))
+        if layout is not None:
+            format_tag, wav_channels, wav_rate, bits, data_offset, data_size = layout
+            sample_format = _sample_format(format_tag, bits)
+            if sample_format is not None:
+                dtype, scale = sample_format
+                available = len(data) - data_offset
+                if data_size == 0 or data_size > available:
+                    data_size = available
+                n_frames = data_size // (dtype.itemsize * wav_channels)
+                # frombuffer is a view over the request bytes; the only copy is the float32 conversion
+                raw = np.frombuffer(data, dtype=dtype, count=n_frames * wav_channels, offset=data_offset)
+                return DecodedAudio(_to_mono_float32(raw.reshape(n_frames, wav_channels), scale), wav_rate)
+    elif sample_rate is not None:
+        n_frames = len(data) // (2 * channels)
+        raw = np.frombuffer(data, dtype="<i2", count=n_frames * channels).reshape(n_frames, channels)
+        return DecodedAudio(_to_mono_float32(raw, 1.0 / 32768.0), sample_rate)
+
+    import soundfile as sf
+
+    raw, wav_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return DecodedAudio(_to_mono_float32(raw, 1.0), wav_rate)
+
+
+def probe_wav(data: bytes) -> Optional[dict]:
+    """Sample rate, channels and duration of in-memory WAV bytes from the header alone, or None."""
+    layout = _read_wav_layout(io.BytesIO(data if isinstance(data, bytes) else bytes(data)))
+    return _probe_layout(layout, len(data))
+
+
+def probe_wav_file(path: str) -> Optional[dict]:
+    """Like probe_wav for a WAV file on disk, reading only its header."""
+    with open(path, "rb") as f:
+        layout = _read_wav_layout(f)
+    return _probe_layout(layout, os.path.getsize(path))
+
+
+def _probe_layout(layout, total_size: int) -> Optional[dict]:
+    if layout is None:
+        return None
+    _, channels, sample_rate, bits, data_offset, data_size = layout
+    available = total_size - data_offset
+    if data_size == 0 or data_size > available:
+        data_size = available
+    return {
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "duration_sec": data_size / float(channels * (bits // 8) * sample_rate),
+    }
+
+
+def wav_duration_sec(data: bytes) -> Optional[float]:
+    """Duration of in-memory WAV bytes from the header alone, or None if it cannot be read."""
+    info = probe_wav(data)
+    return info["duration_sec"] if info else None
+
+
+def encode_wav_bytes(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode mono float32 samples in [-1, 1] as 16-bit PCM WAV bytes."""
+    pcm = np.clip(samples, -1.0, 1.0 - 1.0 / 32768.0)
+    pcm = (pcm * 32768.0).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buffer.getvalue()
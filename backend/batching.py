@@ -0,0 +1,122 @@
+"""
+Micro-batching for GPU inference.
+
+Concurrent callers submit single items; a worker thread groups whatever
+arrives within a short window (or until the batch is full), runs them
+through one batched call and hands each result back to its own caller.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Callable, List, Optional
+
+
+class BatchStats:
+    """Counters for batch fill rate and the queueing latency the batcher adds."""
+
+    def __init__(self, max_batch_size: int, window: int = 1000):
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.items = 0
+        self._queue_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, batch_size: int, queue_ms: List[float]):
+        with self._lock:
+            self.batches += 1
+            self.items += batch_size
+            self._queue_ms.extend(queue_ms)
+
+    @property
+    def fill_rate(self) -> float:
+        """Average batch size as a fraction of max_batch_size."""
+        return self.items / (self.batches * self.max_batch_size) if self.batches else 0.0
+
+    def summary(self):
+        with self._lock:
+            waits = sorted(self._queue_ms)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "fill_rate": self.fill_rate,
+            "mean_queue_ms": sum(waits) / len(waits) if waits else 0.0,
+            "p95_queue_ms": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Collect single requests into batches for `process_batch`.
+
+    Args:
+        process_batch: Called with a list of items; must return a list of results in the same order
+        max_batch_size: Run the batch as soon as this many items are waiting
+        max_wait_ms: Longest time the first item of a batch waits for company
+    """
+
+    def __init__(self, process_batch: Callable[[list], list], max_batch_size: int = 8, max_wait_ms: float = 50.0):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_sec = max_wait_ms / 1000.0
+        self.stats = BatchStats(max_batch_size)
+        self._queue = Queue()
+        self._closed = threading.Event()
+        self._worker = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item) -> Future:
+        if self._closed.is_set():
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def run(self, item, timeout: Optional[float] = None):
+        """Submit one item and block until its result is ready."""
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        self._closed.set()
+        self._worker.join()
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except Empty:
+            return []
+        batch = [first]
+        deadline = first[2] + self.max_wait_sec
+        while len(batch) < self.max_batch_size:
+            # Items that queued up while the previous batch ran are taken without waiting
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            self.stats.record(len(batch), [(started - queued) * 1000 for _, _, queued in batch])
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"process_batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
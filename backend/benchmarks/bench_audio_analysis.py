@@ -0,0 +1,81 @@
+"""
+Per-request timing of analyze_speech: triple decode (before) vs. shared buffer (after).
+
+Before timing, a silent recording is run through prosody_report to check that
+unmeasurable metrics come back as None and the report is strict JSON.
+
+RUN COMMAND: python -m backend.benchmarks.bench_audio_analysis --file-path audiotests/user_recording.wav
+"""
+import argparse
+import json
+import statistics
+import time
+
+import librosa
+import numpy as np
+import parselmouth
+from pydub import AudioSegment
+
+from backend.audio_analysis import analyze_speech, assess
+
+
+def analyze_speech_triple_decode(wav_file):
+    """The original implementation: librosa, parselmouth and pydub each decode the file."""
+    y, sr = librosa.load(wav_file, sr=None)
+    duration_sec = librosa.get_duration(y=y, sr=sr)
+
+    snd = parselmouth.Sound(wav_file)
+    pitch_values = snd.to_pitch().selected_array['frequency']
+    pitch_values = pitch_values[(pitch_values > 50) & (pitch_values < 500)]
+    pitch_sd_st = np.std(12 * np.log2(pitch_values / np.mean(pitch_values)))
+
+    audio = AudioSegment.from_wav(wav_file)
+    loudness_db = audio.dBFS
+    samples = np.array(audio.get_array_of_samples()) / (2**15)
+    20 * np.log10(np.std(samples) + 1e-6)
+
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr)
+    onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr)
+    words_per_minute = (len(onsets) / 2.0) / (duration_sec / 60)
+    return assess(pitch_sd_st, words_per_minute, loudness_db)
+
+
+def check_silent_recording():
+    """Two seconds of digital silence: no pitch, no loudness, and nothing JSON.parse would reject."""
+    from backend.audio_io import encode_wav_bytes
+    from backend.orchestrator import build_feedback_context, prosody_report
+
+    report = prosody_report(encode_wav_bytes(np.zeros(32000, dtype=np.float32), 16000))
+    assert report["pitch_sd_st"] is None and report["loudness_db"] is None, report
+    json.dumps(report, allow_nan=False)  # raises on NaN or Infinity
+    assert "pitch variation" not in report["summary"], report["summary"]
+    build_feedback_context("(silence)", report)
+    print(f"silent recording: {report['summary']}")
+
+
+def time_calls(fn, wav_file, repeats):
+    fn(wav_file)  # warm up librosa/numba caches so both variants are measured hot
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(wav_file)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file-path", default="audiotests/user_recording.wav")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    check_silent_recording()
+    for name, fn in (("before (triple decode)", analyze_speech_triple_decode),
+                     ("after (shared buffer)", analyze_speech)):
+        timings = time_calls(fn, args.file_path, args.repeats)
+        print(f"{name:<24} mean {statistics.mean(timings):8.1f} ms | "
+              f"median {statistics.median(timings):8.1f} ms | min {min(timings):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
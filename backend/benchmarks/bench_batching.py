@@ -0,0 +1,83 @@
+"""
+CPU-only harness for the ASR micro-batcher.
+
+A fake pipeline models a GPU call as a fixed launch cost plus a small
+per-clip cost. Simulated callers submit clips concurrently and the harness
+reports throughput, batch fill rate and the queueing latency the batcher adds.
+
+RUN COMMAND: python -m backend.benchmarks.bench_batching --clients 32 --requests 256
+"""
+import argparse
+import random
+import threading
+import time
+
+from backend.batching import MicroBatcher
+
+
+class FakePipeline:
+    """Stands in for the HF ASR pipeline: cost = launch_ms + per_item_ms * batch size."""
+
+    def __init__(self, launch_ms: float = 120.0, per_item_ms: float = 15.0):
+        self.launch_ms = launch_ms
+        self.per_item_ms = per_item_ms
+        self.busy_sec = 0.0
+
+    def __call__(self, inputs, batch_size=None):
+        cost = (self.launch_ms + self.per_item_ms * len(inputs)) / 1000.0
+        time.sleep(cost)
+        self.busy_sec += cost
+        return [{"text": f"transcript of {item}"} for item in inputs]
+
+
+def run(max_batch_size, max_wait_ms, clients, requests, mean_gap_ms, seed=0):
+    pipeline = FakePipeline()
+    batcher = MicroBatcher(pipeline, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    rng = random.Random(seed)
+    per_client = requests // clients
+    mismatches = []
+
+    def client(client_id):
+        for i in range(per_client):
+            time.sleep(rng.expovariate(1000.0 / mean_gap_ms) if mean_gap_ms else 0)
+            item = f"clip-{client_id}-{i}"
+            result = batcher.run(item)
+            if result["text"] != f"transcript of {item}":
+                mismatches.append(item)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    batcher.close()
+
+    summary = batcher.stats.summary()
+    summary.update({
+        "wall_sec": wall,
+        "clips_per_sec": summary["items"] / wall,
+        "clips_per_busy_sec": summary["items"] / pipeline.busy_sec,
+        "misrouted": len(mismatches),
+    })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batcher throughput and latency harness")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--mean-gap-ms", type=float, default=50.0, help="mean think time between a client's requests")
+    parser.add_argument("--max-wait-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    print(f"{'batch':>5} {'clips/s':>8} {'clips/busy-s':>12} {'fill':>6} {'mean q ms':>10} {'p95 q ms':>9} {'misrouted':>9}")
+    for max_batch_size in (1, 4, 8, 16):
+        s = run(max_batch_size, args.max_wait_ms, args.clients, args.requests, args.mean_gap_ms)
+        print(f"{max_batch_size:>5} {s['clips_per_sec']:>8.1f} {s['clips_per_busy_sec']:>12.1f} {s['fill_rate']:>6.2f} "
+              f"{s['mean_queue_ms']:>10.1f} {s['p95_queue_ms']:>9.1f} {s['misrouted']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Time-to-first-token of streamed vs. blocking LLM feedback, against the local stub server.
+
+RUN COMMAND: python -m backend.benchmarks.bench_feedback_stream
+"""
+import argparse
+import os
+import statistics
+import time
+
+from backend.benchmarks.openai_stub_server import StubConfig, start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = start_stub_server(config=StubConfig(first_token_delay=args.first_token_delay, token_delay=args.token_delay))
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENROUTER_API_KEY"] = "sk-stub-0000000000"
+    os.environ["SPEAKEASY_CACHE_MAX_MB"] = "0"  # every request must reach the server
+
+    from backend import stt_llm_tts
+
+    blocking, first_token, rates = [], [], []
+    for i in range(args.requests):
+        transcript = f"Benchmark transcript number {i}."
+        start = time.perf_counter()
+        stt_llm_tts.get_feedback_from_transcript(transcript)
+        blocking.append(time.perf_counter() - start)
+
+        metrics = {}
+        text = "".join(stt_llm_tts.stream_feedback_from_transcript(transcript, metrics=metrics))
+        assert text == StubConfig().reply, "streamed text does not match the reply"
+        first_token.append(metrics["ttft_sec"])
+        rates.append(metrics["tokens_per_sec"])
+
+    server.shutdown()
+    print(f"blocking call, time to any text : {statistics.mean(blocking) * 1000:7.1f} ms")
+    print(f"streaming, time to first token  : {statistics.mean(first_token) * 1000:7.1f} ms")
+    print(f"streaming, tokens/sec           : {statistics.mean(rates):7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Fan-out, retries and hedging of the shared HTTP layer against a local flaky server.
+
+The server answers after `--latency` seconds, but a `--slow-fraction` of
+requests take `--slow-latency` instead and a `--error-fraction` fail with 503.
+The benchmark compares one-at-a-time blocking requests (the old urlopen
+pattern) with `--clients` concurrent callers sharing one pooled service on the
+I/O loop, then the latency tail with retries and with hedging.
+
+RUN COMMAND: python -m backend.benchmarks.bench_http_clients
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.http_clients import Service, ServicePolicy, run_sync
+
+
+def start_flaky_server(latency: float, slow_latency: float, slow_fraction: float, error_fraction: float, seed: int = 0):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class FlakyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            with lock:
+                roll = rng.random()
+            if roll < error_fraction:
+                time.sleep(latency)
+                self._reply(503, b"busy")
+                return
+            time.sleep(slow_latency if roll < error_fraction + slow_fraction else latency)
+            self._reply(200, b"ok")
+
+        def _reply(self, status, body):
+            try:
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the losing half of a hedge was cancelled
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def timed_get(service: Service, url: str):
+    start = time.perf_counter()
+    try:
+        await service.request("GET", url)
+        return time.perf_counter() - start, True
+    except Exception:
+        return time.perf_counter() - start, False
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(service: Service, url: str, requests: int, clients: int):
+    """`clients` callers each sending requests back to back, so latency excludes queueing."""
+    remaining = iter(range(requests))
+    results = []
+
+    async def client():
+        for _ in remaining:
+            results.append(await timed_get(service, url))
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return results
+
+
+def run(service: Service, url: str, requests: int, clients: int):
+    start = time.perf_counter()
+    results = run_sync(drive(service, url, requests, clients))
+    latencies = [latency for latency, ok in results if ok]
+    return time.perf_counter() - start, latencies, sum(ok for _, ok in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--error-fraction", type=float, default=0.05)
+    parser.add_argument("--hedge-after", type=float, default=0.15)
+    args = parser.parse_args()
+
+    server = start_flaky_server(args.latency, args.slow_latency, args.slow_fraction, args.error_fraction)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    sequential = 20
+    start = time.perf_counter()
+    for _ in range(sequential):
+        try:
+            urllib.request.urlopen(url).read()
+        except Exception:
+            pass
+    per_request = (time.perf_counter() - start) / sequential
+    print(f"urlopen, one at a time        : {per_request * args.requests:6.2f} s for {args.requests} requests (extrapolated)")
+
+    policies = [
+        ("pooled, no retries", ServicePolicy(max_concurrency=args.concurrency, retries=0)),
+        ("pooled + retries", ServicePolicy(max_concurrency=args.concurrency, retries=2, backoff_base_sec=0.05)),
+        ("pooled + retries + hedging", ServicePolicy(
+            max_concurrency=args.concurrency, retries=2, backoff_base_sec=0.05, hedge_after_sec=args.hedge_after)),
+    ]
+    for label, policy in policies:
+        service = Service("bench", policy)
+        elapsed, latencies, succeeded = run(service, url, args.requests, args.clients)
+        print(
+            f"{label:<30}: {elapsed:6.2f} s, {succeeded}/{args.requests} ok, "
+            f"p50 {statistics.median(latencies) * 1000:6.1f} ms, p95 {percentile(latencies, 0.95) * 1000:6.1f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:6.1f} ms | {service.stats}"
+        )
+        run_sync(service.aclose())
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
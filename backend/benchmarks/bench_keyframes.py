@@ -0,0 +1,105 @@
+"""
+Frames kept vs. coverage for fixed every-Nth sampling and adaptive keyframes.
+
+Coverage is the fraction of all frames that look like (thumbnail difference
+below --coverage-threshold) the most recent frame that was sent, i.e. how
+much of what happened the VLM actually saw. Payload is the JPEG bytes of
+the kept frames.
+
+Works on a recorded clip (any video OpenCV can read, a frame store directory
+written by input/video.py, or a .npy frame array) or on a synthetic clip of a mostly still speaker with a few
+gestures.
+
+RUN COMMAND: python -m backend.benchmarks.bench_keyframes [--clip video/video_file.frames]
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+from backend.input.frame_store import FrameStoreReader
+from backend.keyframes import DEFAULT_THRESHOLDS, KeyframeSelector, frame_signature, signature_distance
+
+
+def load_clip(path: str):
+    if os.path.isdir(path):
+        return FrameStoreReader(path)
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def synthetic_clip(seconds: float = 30.0, fps: int = 30, seed: int = 0):
+    """A still 'speaker' with three short gestures and a posture shift, plus sensor noise."""
+    rng = np.random.default_rng(seed)
+    gestures = [(5.0, 6.5), (14.0, 15.0), (22.0, 24.0)]
+    shift_at = 18.0
+    frames = []
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+        x = 220 + (60 if t >= shift_at else 0)
+        cv2.rectangle(frame, (x, 170), (x + 200, 480), (60, 50, 40), -1)  # torso, close to the camera
+        cv2.circle(frame, (x + 100, 100), 75, (120, 150, 200), -1)  # head
+        for start, end in gestures:
+            if start <= t < end:
+                phase = (t - start) / (end - start)
+                hand_y = int(420 - 330 * np.sin(np.pi * phase))
+                cv2.line(frame, (x + 190, 220), (x + 330, hand_y), (60, 50, 40), 50)
+        noise = rng.integers(-4, 5, frame.shape, dtype=np.int16)
+        frames.append(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def evaluate(frames, fps, keep_mask, coverage_threshold):
+    """Frames kept, coverage, longest gap and JPEG payload for a keep mask."""
+    kept_idx = np.flatnonzero(keep_mask)
+    covered = 0
+    last_sig = None
+    for i, frame in enumerate(frames):
+        sig = frame_signature(frame, "diff")
+        if keep_mask[i]:
+            last_sig = sig
+        if last_sig is not None and signature_distance(sig, last_sig, "diff") < coverage_threshold:
+            covered += 1
+    gaps = np.diff(np.concatenate(([0], kept_idx, [len(frames)]))) / fps
+    payload = sum(len(cv2.imencode(".jpg", frames[i], [cv2.IMWRITE_JPEG_QUALITY, 85])[1]) for i in kept_idx)
+    return len(kept_idx), covered / len(frames), float(gaps.max()), payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyframe selection: frames kept vs. coverage")
+    parser.add_argument("--clip", help="video file, frame store directory or .npy array (default: synthetic clip)")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--every-n", type=int, default=30, help="fixed-sampling baseline (the old fps_limit)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--coverage-threshold", type=float, default=DEFAULT_THRESHOLDS["diff"])
+    args = parser.parse_args()
+
+    frames = load_clip(args.clip) if args.clip else synthetic_clip(fps=int(args.fps))
+    n = len(frames)
+    print(f"{n} frames ({n / args.fps:.1f} s)\n")
+    print(f"{'strategy':<22} {'kept':>5} {'coverage':>9} {'max gap s':>10} {'payload KB':>11}")
+
+    fixed = np.arange(n) % args.every_n == 0
+    rows = [(f"every {args.every_n}th frame", fixed)]
+    for method in DEFAULT_THRESHOLDS:
+        selector = KeyframeSelector(method=method, max_frames=args.max_frames, expected_duration_sec=n / args.fps)
+        rows.append((f"adaptive ({method})", np.array([selector.offer(f, i / args.fps) for i, f in enumerate(frames)])))
+
+    for name, mask in rows:
+        kept, coverage, max_gap, payload = evaluate(frames, args.fps, mask, args.coverage_threshold)
+        print(f"{name:<22} {kept:>5} {coverage:>9.1%} {max_gap:>10.1f} {payload / 1024:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Offline harness for long-form chunked transcription.
+
+Synthesizes a speech-like signal where every "word" is a tone burst whose
+pitch encodes its label, separated by short gaps and longer sentence pauses.
+A fake backend decodes each chunk, finds the bursts and returns them as
+timestamped segments, taking time proportional to the audio it receives.
+The harness checks that the stitched transcript has every word exactly once,
+in order, including when chunks fail transiently, and reports the speedup
+over sending the whole recording as one request.
+
+RUN COMMAND: python -m backend.benchmarks.bench_longform --minutes 8 --workers 8
+"""
+import argparse
+import random
+import threading
+import time
+
+import numpy as np
+
+from backend.audio_io import decode_audio_bytes, encode_wav_bytes
+from backend.longform import transcribe_long
+from backend.transcription import TranscriptionClient
+
+SAMPLE_RATE = 16000
+N_LABELS = 48
+BASE_HZ = 300.0
+STEP_HZ = 30.0
+
+
+def synthesize_speech(minutes: float, seed: int = 0):
+    """Return (samples, expected_words) for a synthetic speech of the given length."""
+    rng = random.Random(seed)
+    pieces, words = [], []
+    total = 0
+    k = 0
+    while total < minutes * 60 * SAMPLE_RATE:
+        label = k % N_LABELS
+        length = int(rng.uniform(0.18, 0.35) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        burst = 0.3 * np.sin(2 * np.pi * (BASE_HZ + STEP_HZ * label) * t) * np.hanning(length)
+        gap = rng.uniform(0.6, 1.2) if k % 9 == 8 else rng.uniform(0.12, 0.2)
+        pieces += [burst, np.zeros(int(gap * SAMPLE_RATE))]
+        words.append(f"w{label}")
+        total += length + int(gap * SAMPLE_RATE)
+        k += 1
+    samples = np.concatenate(pieces).astype(np.float32)
+    samples += np.random.default_rng(seed).normal(0, 0.002, len(samples)).astype(np.float32)
+    return samples, words
+
+
+class FakeToneBackend:
+    """Finds tone bursts in a chunk and labels them by pitch; cost grows with audio length."""
+    name = "fake-tone"
+
+    def __init__(self, base_sec: float = 0.05, sec_per_audio_sec: float = 0.01, fail_first_calls: int = 0):
+        self.base_sec = base_sec
+        self.sec_per_audio_sec = sec_per_audio_sec
+        self.fail_first_calls = fail_first_calls
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, wav_bytes: bytes, return_timestamps: bool = False) -> dict:
+        with self._lock:
+            self.calls += 1
+            should_fail = self.calls <= self.fail_first_calls
+        audio = decode_audio_bytes(wav_bytes)
+        time.sleep(self.base_sec + self.sec_per_audio_sec * audio.duration_sec)
+        if should_fail:
+            raise RuntimeError("injected backend failure")
+
+        hop = SAMPLE_RATE // 100
+        n_frames = len(audio.samples) // hop
+        energy = np.square(audio.samples[: n_frames * hop].reshape(n_frames, hop)).mean(axis=1)
+        active = np.concatenate(([False], energy > 1e-3, [False]))
+        edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+        chunks = []
+        for start, end in zip(edges[::2], edges[1::2]):
+            if end - start < 5:  # shorter than 50 ms: a clipped word at the chunk edge
+                continue
+            segment = audio.samples[start * hop:end * hop]
+            spectrum = np.abs(np.fft.rfft(segment))
+            peak_hz = np.argmax(spectrum) * SAMPLE_RATE / len(segment)
+            label = int(round((peak_hz - BASE_HZ) / STEP_HZ))
+            chunks.append({"text": f" w{label}", "timestamp": (start * hop / SAMPLE_RATE, end * hop / SAMPLE_RATE)})
+        return {"text": "".join(c["text"] for c in chunks), "chunks": chunks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-form transcription ordering/overlap/speedup harness")
+    parser.add_argument("--minutes", type=float, default=8.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--fail-first", type=int, default=2, help="inject this many transient chunk failures")
+    args = parser.parse_args()
+
+    samples, expected = synthesize_speech(args.minutes)
+    wav_bytes = encode_wav_bytes(samples, SAMPLE_RATE)
+    print(f"Synthetic speech: {len(samples) / SAMPLE_RATE:.0f} s, {len(expected)} words")
+
+    single = TranscriptionClient(FakeToneBackend(), max_workers=1)
+    start = time.perf_counter()
+    whole = single.transcribe_bytes(wav_bytes)
+    whole_sec = time.perf_counter() - start
+    single.close()
+
+    backend = FakeToneBackend(fail_first_calls=args.fail_first)
+    chunked = TranscriptionClient(backend, max_workers=args.workers)
+    start = time.perf_counter()
+    result = transcribe_long(wav_bytes, client=chunked)
+    chunked_sec = time.perf_counter() - start
+    chunked.close()
+
+    got = result.text.split()
+    first_diff = next((i for i, (a, b) in enumerate(zip(got, expected)) if a != b), None)
+    print(f"single request : {whole_sec:6.2f} s, words correct: {whole.text.split() == expected}")
+    print(f"long-form      : {chunked_sec:6.2f} s, {backend.calls} backend calls, "
+          f"{len(result.chunks)} segments, failed chunks: {result.failed_chunks}")
+    print(f"speedup        : {whole_sec / chunked_sec:6.2f}x")
+    print(f"stitched words : {len(got)} / {len(expected)} expected, exact match: {got == expected}"
+          + (f", first mismatch at word {first_diff}" if first_diff is not None else ""))
+    timestamps = [c["timestamp"][0] for c in result.chunks]
+    print(f"segments ordered by time: {timestamps == sorted(timestamps)}")
+
+
+if __name__ == "__main__":
+    main()
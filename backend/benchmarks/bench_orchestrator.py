@@ -0,0 +1,156 @@
+"""
+End-to-end session latency: fan-out orchestration vs. running each stage in turn.
+
+Every remote service is local and offline. The stub ASR backend sleeps
+`--asr-delay` seconds, a stub VLM endpoint sleeps `--vlm-delay` seconds, and
+the LLM is the OpenAI-compatible stub server. Prosody is replaced by
+`--prosody-sec` of pure-Python CPU work in the process pool, so the
+benchmark runs without parselmouth.
+
+RUN COMMAND: python -m backend.benchmarks.bench_orchestrator
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+PROSODY_SEC = 1.5
+SAMPLE_RATE = 16000
+
+
+def cpu_prosody(wav_bytes: bytes, speech=None) -> dict:
+    """Stand-in for prosody_report: burns CPU for PROSODY_SEC (read from the environment in workers)."""
+    seconds = float(os.getenv("BENCH_PROSODY_SEC", PROSODY_SEC))
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(i * i for i in range(2000))
+    return {
+        "summary": "Based on your speech, you have good pitch variation.",
+        "words_per_minute": 160.0,
+        "pitch_sd_st": 2.5,
+        "loudness_db": -18.0,
+        "pause_count": 3,
+        "longest_pause_sec": 0.8,
+    }
+
+
+def start_vlm_stub(delay: float):
+    from backend.frame_codec import unpack_frames
+
+    class VLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            header, frames = unpack_frames(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            body = json.dumps({
+                "frames_processed": len(frames),
+                "rating_summary": {"Posture": "high", "Eye Contact": "medium"},
+                "combined_analysis": "Steady posture; look up from your notes more often.",
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), VLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def speech_wav(seconds: float) -> bytes:
+    from backend.audio_io import encode_wav_bytes
+
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = (np.sin(2 * np.pi * 0.7 * t) > -0.3).astype(np.float32)  # speech with pauses
+    return encode_wav_bytes((0.3 * envelope * np.sin(2 * np.pi * 180 * t)).astype(np.float32), SAMPLE_RATE)
+
+
+def run_sequential(session, vlm_url: str) -> dict:
+    """The old shape: each stage waits for the one before it."""
+    from backend.frame_codec import post_frames_async
+    from backend.http_clients import run_sync
+    from backend.orchestrator import build_feedback_context
+    from backend.stt_llm_tts import get_transcript, stream_feedback_from_transcript
+
+    timings = {}
+    start = time.perf_counter()
+    prosody = cpu_prosody(session.audio_bytes)
+    timings["prosody"] = time.perf_counter() - start
+    mark = time.perf_counter()
+    transcript = get_transcript(session.audio_bytes)
+    timings["transcript"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    video = run_sync(post_frames_async(vlm_url, {"final": True, "question": "rate"}, session.frames))
+    timings["video"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    "".join(stream_feedback_from_transcript(build_feedback_context(transcript, prosody, video)))
+    timings["feedback"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--audio-sec", type=float, default=20.0)
+    parser.add_argument("--asr-delay", type=float, default=1.2)
+    parser.add_argument("--vlm-delay", type=float, default=2.0)
+    parser.add_argument("--prosody-sec", type=float, default=PROSODY_SEC)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    from backend.benchmarks.openai_stub_server import StubConfig, start_stub_server
+
+    llm = start_stub_server(config=StubConfig(first_token_delay=args.first_token_delay, token_delay=0.01))
+    vlm = start_vlm_stub(args.vlm_delay)
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{llm.server_address[1]}/v1"
+    os.environ["OPENROUTER_API_KEY"] = "sk-stub-0000000000"
+    os.environ["SPEAKEASY_CACHE_MAX_MB"] = "0"  # every session must reach the stubs
+    os.environ["BENCH_PROSODY_SEC"] = str(args.prosody_sec)
+
+    from backend import transcription
+    from backend.orchestrator import Orchestrator, Session
+
+    transcription._client = transcription.TranscriptionClient(transcription.StubBackend(delay_sec=args.asr_delay))
+    vlm_url = f"http://127.0.0.1:{vlm.server_address[1]}/"
+    orchestrator = Orchestrator(vlm_url=vlm_url, prosody_fn=cpu_prosody)
+    frames = [os.urandom(20_000) for _ in range(8)]  # the stub never decodes them
+    # Start the worker processes before timing anything
+    orchestrator._process_pool().submit(sum, [0]).result()
+
+    sequential, parallel = [], []
+    for i in range(args.sessions):
+        session = Session(speech_wav(args.audio_sec + i * 0.01), frames=frames)  # distinct audio: no cache hits
+        sequential.append(run_sequential(session, vlm_url))
+        events = []
+        result = orchestrator.run(session, on_event=lambda name, **fields: events.append(name))
+        assert result["feedback"] and not result["errors"], result["errors"]
+        assert events.index("feedback") > max(events.index(name) for name in ("prosody", "transcript", "video"))
+        parallel.append(result["timings"])
+
+    def mean(rows, key):
+        return sum(row[key] for row in rows) / len(rows)
+
+    print(f"stages: prosody {mean(sequential, 'prosody'):.2f}s, transcription {mean(sequential, 'transcript'):.2f}s, "
+          f"video {mean(sequential, 'video'):.2f}s, feedback {mean(sequential, 'feedback'):.2f}s")
+    print(f"sequential end-to-end : {mean(sequential, 'total'):6.2f} s")
+    print(f"fan-out end-to-end    : {mean(parallel, 'total'):6.2f} s "
+          f"(branches {mean(parallel, 'branches'):.2f}s wall vs {mean(parallel, 'branches_sum'):.2f}s summed, "
+          f"feedback {mean(parallel, 'feedback'):.2f}s)")
+    orchestrator.close()
+    llm.shutdown()
+    vlm.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Upload burst against the production server, with and without admission control.
+
+Starts `python -m backend.serve` (gunicorn) twice: once unbounded, and once
+with a pending-job limit and an upload-slot limit. Each server gets a burst of
+`--burst` concurrent uploads. The stub ASR backend answers at once, and the
+LLM is the OpenAI-compatible stub server with `--first-token-delay`, so each
+job takes a known amount of time on `--job-workers` workers. The benchmark
+reports status codes, how long the last accepted job waited to finish, and
+/api/health latency while the burst is queued. The recordings it creates are
+deleted afterwards.
+
+Needs gunicorn (backend/requirements.txt).
+
+RUN COMMAND: python -m backend.benchmarks.bench_serve
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def multipart(field: str, filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: audio/wav\r\n\r\n"
+    ).encode("utf-8") + data + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def upload(base: str, wav: bytes):
+    body, content_type = multipart("audio", "burst.wav", wav)
+    req = urllib.request.Request(f"{base}/api/upload-audio", data=body, headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except (urllib.error.URLError, ConnectionError) as e:
+        return None, {"error": str(e)}  # e.g. reset after a 413 sent before the body was read
+
+
+def get_json(url: str):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.serve"], cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            get_json(f"http://127.0.0.1:{port}/api/health")
+            return process
+        except Exception:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("server did not start (is gunicorn installed?)")
+
+
+def run_burst(label: str, base_env: dict, args, wav: bytes, limits: dict) -> list:
+    port = free_port()
+    env = {**base_env, "SPEAKEASY_BIND": f"127.0.0.1:{port}", **limits}
+    process = start_server(port, env)
+    base = f"http://127.0.0.1:{port}"
+    results, health = [], []
+    done = threading.Event()
+
+    def probe_health():
+        while not done.is_set():
+            start = time.perf_counter()
+            get_json(f"{base}/api/health")
+            health.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+    prober = threading.Thread(target=probe_health)
+    prober.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=lambda: results.append(upload(base, wav))) for _ in range(args.burst)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    admitted_sec = time.perf_counter() - start
+
+    accepted = [payload for status, payload in results if status == 202]
+    for payload in accepted:
+        while get_json(f"{base}{payload['status_url']}")["status"] not in ("done", "failed"):
+            time.sleep(0.1)
+    drained_sec = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    oversized, _ = upload(base, os.urandom(int(float(env["SPEAKEASY_MAX_UPLOAD_MB"]) * 1024 * 1024) + 1))
+    process.terminate()
+    process.wait(timeout=30)
+
+    codes = Counter(status for status, _ in results)
+    retry_after = [payload["retry_after_sec"] for status, payload in results if status in (429, 503)]
+    print(
+        f"{label:<22}: {dict(sorted(codes.items()))}, burst answered in {admitted_sec:5.2f} s, "
+        f"last accepted job done after {drained_sec:5.2f} s"
+    )
+    print(
+        f"{'':<22}  health p50 {statistics.median(health) * 1000:5.1f} ms, max {max(health) * 1000:6.1f} ms; "
+        f"Retry-After {min(retry_after, default=0)}-{max(retry_after, default=0)} s; oversized upload -> {oversized or 'reset while sending (413)'}"
+    )
+    return [payload["recording_id"] for payload in accepted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--burst", type=int, default=40)
+    parser.add_argument("--job-workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=8)
+    parser.add_argument("--max-uploads", type=int, default=16)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--audio-sec", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from backend.audio_io import encode_wav_bytes
+    from backend.benchmarks.openai_stub_server import StubConfig, start_stub_server
+    from backend.recordings import RecordingStore
+
+    llm = start_stub_server(config=StubConfig(first_token_delay=args.first_token_delay, token_delay=0.005))
+    t = np.arange(int(args.audio_sec * 16000)) / 16000
+    wav = encode_wav_bytes((0.3 * np.sin(2 * np.pi * 180 * t)).astype(np.float32), 16000)
+    base_env = {
+        **os.environ,
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{llm.server_address[1]}/v1",
+        "OPENROUTER_API_KEY": "sk-stub-0000000000",
+        "SPEAKEASY_ASR_BACKEND": "stub",
+        "SPEAKEASY_CACHE_MAX_MB": "0",
+        "SPEAKEASY_WARMUP": "off",
+        "SPEAKEASY_JOB_WORKERS": str(args.job_workers),
+        "SPEAKEASY_PROSODY_WORKERS": "1",
+        "SPEAKEASY_MAX_UPLOAD_MB": "4",
+    }
+
+    recording_ids = []
+    try:
+        recording_ids += run_burst("unbounded", base_env, args, wav, {
+            "SPEAKEASY_MAX_PENDING_JOBS": "0", "SPEAKEASY_MAX_CONCURRENT_UPLOADS": str(args.burst * 2),
+        })
+        recording_ids += run_burst("admission control", base_env, args, wav, {
+            "SPEAKEASY_MAX_PENDING_JOBS": str(args.max_pending),
+            "SPEAKEASY_MAX_CONCURRENT_UPLOADS": str(args.max_uploads),
+        })
+    finally:
+        audio_dir = os.path.join(PROJECT_ROOT, "audiotests")
+        store = RecordingStore(os.path.join(audio_dir, "recordings.db"), audio_dir)
+        for recording_id in recording_ids:
+            store.delete(recording_id)
+        llm.shutdown()
+
+
+if __name__ == "__main__":
+    main()
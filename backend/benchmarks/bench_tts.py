@@ -0,0 +1,53 @@
+"""
+Time to first audio of sentence-streamed TTS vs. one whole-text request, with the fake backend.
+
+Also checks that streamed clips arrive in sentence order and that a repeat of
+the same feedback is served from the phrase cache.
+
+RUN COMMAND: python -m backend.benchmarks.bench_tts
+"""
+import argparse
+import time
+
+from backend.benchmarks.openai_stub_server import DEFAULT_REPLY
+from backend.tts import DEFAULT_VOICE_SETTINGS, FakeTTSBackend, PhraseCache, TTSEngine, split_sentences
+
+OPTIONS = dict(voice_id="voice", model_id="model", output_format="pcm_16000")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parallel", type=int, default=3)
+    parser.add_argument("--first-byte-delay", type=float, default=0.3)
+    parser.add_argument("--char-delay", type=float, default=0.004)
+    args = parser.parse_args()
+
+    backend = FakeTTSBackend(first_byte_delay=args.first_byte_delay, char_delay=args.char_delay)
+    sentences = split_sentences(DEFAULT_REPLY)
+
+    # Baseline: the whole reply in one request, nothing plays until it is done
+    start = time.perf_counter()
+    backend.synthesize(DEFAULT_REPLY, OPTIONS["voice_id"], OPTIONS["model_id"], DEFAULT_VOICE_SETTINGS, OPTIONS["output_format"])
+    whole = time.perf_counter() - start
+
+    engine = TTSEngine(backend, max_parallel=args.parallel, cache=PhraseCache())
+    expected = [
+        backend.synthesize(s, OPTIONS["voice_id"], OPTIONS["model_id"], DEFAULT_VOICE_SETTINGS, OPTIONS["output_format"])
+        for s in sentences
+    ]
+    cold, warm = {}, {}
+    clips = list(engine.stream(DEFAULT_REPLY, metrics=cold, **OPTIONS))
+    assert clips == expected, "streamed clips are out of order"
+    calls_before = backend.calls
+    list(engine.stream(DEFAULT_REPLY, metrics=warm, **OPTIONS))
+    assert backend.calls == calls_before, "repeat was not served from the phrase cache"
+    engine.close()
+
+    print(f"{len(sentences)} sentences, {args.parallel} in flight")
+    print(f"whole text, time to first audio      : {whole * 1000:7.1f} ms")
+    print(f"streamed, time to first audio        : {cold['ttfa_sec'] * 1000:7.1f} ms (all audio {cold['elapsed_sec'] * 1000:.1f} ms)")
+    print(f"streamed repeat, time to first audio : {warm['ttfa_sec'] * 1000:7.1f} ms ({warm['cache_hits']} cache hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Minimal OpenAI-compatible chat completions server for offline testing.
+
+Serves POST /v1/chat/completions (and /api/v1/... like OpenRouter), both
+blocking and `stream=True` server-sent events, with a configurable delay
+before the first token and between tokens. Point the app at it with:
+
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1 OPENROUTER_API_KEY=sk-stub-0000000000
+
+RUN COMMAND: python -m backend.benchmarks.openai_stub_server --port 8089
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Strong opening claim, but support it with a specific statistic. "
+    "Signpost your two contentions so the judge can flow them. "
+    "Expect the opposition to attack feasibility; prepare a cost-benefit response. "
+    "Consider citing the IPCC AR6 synthesis report and peer-reviewed carbon pricing studies."
+)
+
+
+class StubConfig:
+    def __init__(self, reply: str = DEFAULT_REPLY, first_token_delay: float = 0.5, token_delay: float = 0.02):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def tokens(self):
+        """Split the reply into word-sized pieces that keep their leading space."""
+        words = self.reply.split(" ")
+        return [words[0]] + [" " + w for w in words[1:]]
+
+
+def make_handler(config: StubConfig):
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            model = body.get("model", "stub")
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            tokens = config.tokens()
+
+            if not body.get("stream"):
+                time.sleep(config.first_token_delay + config.token_delay * len(tokens))
+                self._send_json({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": config.reply}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            time.sleep(config.first_token_delay)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(config.token_delay)
+                self._send_chunk({"role": "assistant", "content": token} if i == 0 else {"content": token},
+                                 completion_id, model)
+            self._send_chunk({}, completion_id, model, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._send_event({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": [],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                })
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+        def _send_chunk(self, delta, completion_id, model, finish_reason=None):
+            self._send_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        def _send_event(self, payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def _send_json(self, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return ChatCompletionsHandler
+
+
+def start_stub_server(port: int = 0, config: StubConfig = None) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; port 0 picks a free port (see server.server_address)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config or StubConfig()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    config = StubConfig(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(config))
+    print(f"Stub OpenAI server on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
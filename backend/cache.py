@@ -0,0 +1,155 @@
+"""
+Content-addressed, size-bounded on-disk cache for transcripts and LLM feedback.
+
+Keys are SHA-256 digests of everything that determines the output (audio
+bytes + model + revision, or transcript + prompt + model), so a replayed
+upload skips Whisper and GPT entirely. Entries are JSON files; the least
+recently used ones are evicted once the cache grows past its byte budget.
+
+    SPEAKEASY_CACHE_DIR=<project>/.cache/speakeasy
+    SPEAKEASY_CACHE_MAX_MB=256
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_ROOT, ".cache", "speakeasy")
+
+
+def make_key(*parts) -> str:
+    """SHA-256 over length-prefixed parts, so ("ab", "c") and ("a", "bc") never collide."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, (bytes, bytearray, memoryview)) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class DiskLRUCache:
+    """
+    JSON values on disk, evicted least-recently-used first.
+
+    Args:
+        directory: Where entries are stored (one file per key, sharded by prefix)
+        max_bytes: Total size of entries to keep
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """Rebuild the LRU order from file access times left by a previous process."""
+        entries = []
+        for shard in os.listdir(self.directory):
+            shard_dir = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith(".json"):
+                    stat = os.stat(os.path.join(shard_dir, name))
+                    entries.append((stat.st_atime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # persist recency for the next process
+        except (OSError, ValueError):
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._forget(key)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _forget(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> Optional[DiskLRUCache]:
+    """Named process-wide cache under SPEAKEASY_CACHE_DIR, or None if caching is disabled (max 0 MB)."""
+    with _caches_lock:
+        if name not in _caches:
+            max_mb = float(os.getenv("SPEAKEASY_CACHE_MAX_MB", "256"))
+            directory = os.path.join(os.getenv("SPEAKEASY_CACHE_DIR", DEFAULT_CACHE_DIR), name)
+            _caches[name] = DiskLRUCache(directory, int(max_mb * 1024 * 1024)) if max_mb > 0 else None
+        return _caches[name]
+
+
+def cache_stats():
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items() if cache is not None}
@@ -0,0 +1,125 @@
+"""
+Binary transport for video frames sent to the VLM endpoint.
+
+Frames are JPEG-encoded straight from OpenCV's BGR buffer and packed into one
+length-prefixed body instead of base64 strings inside a JSON document:
+
+    MAGIC (4 bytes) | u32 header length | JSON header | (u32 frame length | JPEG bytes) * frame_count
+
+All integers are big-endian. The header carries the request fields (question,
+session_id, ...) plus `frame_count`. Unpacking returns memoryviews into the
+request body, so the server never copies or base64-decodes a frame.
+"""
+import json
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+MAGIC = b"SPKF"
+CONTENT_TYPE = "application/x-speakeasy-frames"
+_U32 = struct.Struct(">I")
+
+
+@dataclass(frozen=True)
+class FramePolicy:
+    """How much detail a question needs: longest side in pixels (None keeps the size) and JPEG quality."""
+
+    max_side: Optional[int] = 640
+    quality: int = 80
+
+
+# Fewer pixels also means fewer image tokens for Qwen2-VL (one per 28x28 patch)
+POLICIES = {
+    "default": FramePolicy(640, 80),
+    "posture": FramePolicy(448, 70),  # body position and gestures survive heavy downscaling
+    "face": FramePolicy(768, 88),  # eye contact and expressions need detail
+}
+# Keywords that select a policy; when several match, the most detailed one wins
+POLICY_KEYWORDS = {
+    "face": ("facial", "expression", "eye contact", "gaze"),
+    "posture": ("posture", "gesture", "stance", "body language"),
+}
+
+
+def policy_for_question(question: str) -> FramePolicy:
+    """Pick the frame policy for an analysis question from the aspects it asks about."""
+    text = (question or "").lower()
+    for name in ("face", "posture"):
+        if any(keyword in text for keyword in POLICY_KEYWORDS[name]):
+            return POLICIES[name]
+    return POLICIES["default"]
+
+
+def encode_jpeg(frame: np.ndarray, policy: FramePolicy = POLICIES["default"]) -> bytes:
+    """JPEG-encode a BGR frame, downscaling it first if it is larger than the policy allows."""
+    import cv2  # only the capture side encodes; the VLM server just unpacks
+
+    if policy.max_side:
+        height, width = frame.shape[:2]
+        scale = policy.max_side / max(height, width)
+        if scale < 1:
+            frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, policy.quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def pack_frames(header: dict, frames) -> bytes:
+    """Build a request body from a JSON-serializable header and encoded frames."""
+    header_bytes = json.dumps({**header, "frame_count": len(frames)}).encode("utf-8")
+    parts = [MAGIC, _U32.pack(len(header_bytes)), header_bytes]
+    for frame in frames:
+        parts.append(_U32.pack(len(frame)))
+        parts.append(frame)
+    return b"".join(parts)
+
+
+async def post_frames_async(url: str, header: dict, frames) -> dict:
+    """POST a packed frame body on the shared "modal" HTTP pool and return the decoded JSON response."""
+    from backend.http_clients import get_service  # the VLM server only unpacks
+
+    body = pack_frames(header, frames)
+    response = await get_service("modal").request("POST", url, content=body, headers={"Content-Type": CONTENT_TYPE})
+    return response.json()
+
+
+def unpack_frames(body: bytes):
+    """
+    Split a packed body into its header and frames.
+
+    Returns:
+        (header dict, list of memoryviews over the JPEG bytes of each frame)
+
+    Raises:
+        ValueError: if the body is truncated or not in this format
+    """
+    view = memoryview(body)
+    if bytes(view[:4]) != MAGIC:
+        raise ValueError("Not a packed frame body (bad magic)")
+    offset = 4
+
+    def read_u32():
+        nonlocal offset
+        if offset + 4 > len(view):
+            raise ValueError("Truncated frame body")
+        (value,) = _U32.unpack_from(view, offset)
+        offset += 4
+        return value
+
+    header_len = read_u32()
+    if offset + header_len > len(view):
+        raise ValueError("Truncated frame body")
+    header = json.loads(bytes(view[offset:offset + header_len]))
+    offset += header_len
+
+    frames = []
+    for _ in range(header.get("frame_count", 0)):
+        frame_len = read_u32()
+        if offset + frame_len > len(view):
+            raise ValueError("Truncated frame body")
+        frames.append(view[offset:offset + frame_len])
+        offset += frame_len
+    return header, frames
@@ -0,0 +1,314 @@
+"""
+Shared outbound HTTP layer for OpenRouter, ElevenLabs and the Modal endpoints.
+
+Every external call runs on one background asyncio loop, so a Flask worker
+thread can hand off any number of requests and block only on the result it
+needs. Each service has its own keep-alive connection pool (an
+httpx.AsyncClient that the SDK clients share), a concurrency limit, a total
+deadline per attempt, and retries with full-jitter exponential backoff on
+timeouts, connection errors and 408/429/5xx responses.
+
+A service may also hedge: if an attempt has not finished after
+`hedge_after_sec`, a second identical attempt starts, the first to succeed
+wins and the other is cancelled. That cuts tail latency, but every one of
+these services bills the duplicate (LLM tokens, Modal GPU time, ElevenLabs
+characters), so hedging is off by default everywhere. Enable it per service
+with SPEAKEASY_HTTP_<SERVICE>_HEDGE_SEC. ElevenLabs hedges only short texts
+even then (see tts_elevenlabs.HEDGE_MAX_CHARS).
+
+Policies can be overridden per service from the environment:
+
+    SPEAKEASY_HTTP_<SERVICE>_CONCURRENCY=8
+    SPEAKEASY_HTTP_<SERVICE>_TIMEOUT=60
+    SPEAKEASY_HTTP_<SERVICE>_RETRIES=2
+    SPEAKEASY_HTTP_<SERVICE>_HEDGE_SEC=2     (0 disables hedging)
+
+Sync code calls `run_sync(coro)` (or `submit(coro)` for a Future);
+`iterate_sync(agen)` turns an async generator into a plain iterator.
+"""
+import asyncio
+import os
+import random
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, Tuple, Type
+
+RETRY_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class ServicePolicy:
+    """Connection, concurrency and retry settings for one external service."""
+    max_concurrency: int = 8  # attempts in flight at once (hedges included)
+    max_connections: int = 16  # keep-alive pool size
+    timeout_sec: float = 60.0  # deadline for one whole attempt
+    connect_timeout_sec: float = 5.0
+    retries: int = 2
+    backoff_base_sec: float = 0.25
+    backoff_max_sec: float = 4.0
+    hedge_after_sec: Optional[float] = None  # None disables hedging
+
+
+DEFAULT_POLICIES = {
+    "openrouter": ServicePolicy(max_concurrency=16, max_connections=32, timeout_sec=180.0),
+    "elevenlabs": ServicePolicy(max_concurrency=6, max_connections=12, timeout_sec=30.0),
+    "modal": ServicePolicy(max_concurrency=4, max_connections=8, timeout_sec=300.0, connect_timeout_sec=10.0, retries=1),
+}
+
+_ENV_FIELDS = (
+    ("CONCURRENCY", "max_concurrency", int),
+    ("TIMEOUT", "timeout_sec", float),
+    ("RETRIES", "retries", int),
+    ("HEDGE_SEC", "hedge_after_sec", float),
+)
+
+
+def policy_for(name: str) -> ServicePolicy:
+    """The default policy for a service with SPEAKEASY_HTTP_<NAME>_* overrides applied."""
+    policy = DEFAULT_POLICIES.get(name, ServicePolicy())
+    overrides = {}
+    for suffix, field, cast in _ENV_FIELDS:
+        value = os.getenv(f"SPEAKEASY_HTTP_{name.upper()}_{suffix}")
+        if value:
+            overrides[field] = cast(value)
+    if overrides.get("hedge_after_sec") == 0:
+        overrides["hedge_after_sec"] = None
+    return replace(policy, **overrides)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # httpx.HTTPStatusError carries the response; the OpenAI and ElevenLabs SDK errors carry status_code
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures and 408/425/429/5xx responses are worth another attempt."""
+    import httpx
+
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    return _status_code(error) in RETRY_STATUS
+
+
+def _retry_after_sec(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Service:
+    """
+    Pooled client, concurrency limit, retries and hedging for one external service.
+
+    Use it only from the shared I/O loop (see `submit` / `run_sync`); the pool
+    and the semaphore belong to that loop.
+    """
+
+    def __init__(self, name: str, policy: Optional[ServicePolicy] = None):
+        self.name = name
+        self.policy = policy or policy_for(name)
+        self._semaphore = asyncio.Semaphore(self.policy.max_concurrency)
+        self._client = None
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0, "in_flight": 0}
+
+    @property
+    def client(self):
+        """The service's keep-alive httpx.AsyncClient (created on first use)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+
+                    self._client = httpx.AsyncClient(
+                        timeout=httpx.Timeout(self.policy.timeout_sec, connect=self.policy.connect_timeout_sec),
+                        limits=httpx.Limits(
+                            max_connections=self.policy.max_connections,
+                            max_keepalive_connections=self.policy.max_connections,
+                        ),
+                    )
+        return self._client
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the service's concurrency slots, e.g. for the whole body of a stream."""
+        async with self._semaphore:
+            self.stats["in_flight"] += 1
+            try:
+                yield
+            finally:
+                self.stats["in_flight"] -= 1
+
+    def backoff_sec(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Full-jitter exponential backoff, stretched to the server's Retry-After when it sends one."""
+        ceiling = min(self.policy.backoff_max_sec, self.policy.backoff_base_sec * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+        retry_after = _retry_after_sec(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.policy.backoff_max_sec))
+        return delay
+
+    async def _attempt(self, fn: Callable[[], Awaitable], limit: bool, started: Optional[asyncio.Event] = None):
+        if not limit:
+            return await self._run_attempt(fn, started)
+        async with self.slot():
+            return await self._run_attempt(fn, started)
+
+    async def _run_attempt(self, fn: Callable[[], Awaitable], started: Optional[asyncio.Event]):
+        self.stats["attempts"] += 1
+        if started is not None:
+            started.set()
+        return await asyncio.wait_for(fn(), self.policy.timeout_sec)
+
+    async def _hedged(self, fn: Callable[[], Awaitable], limit: bool):
+        started = asyncio.Event()
+        first = asyncio.ensure_future(self._attempt(fn, limit, started))
+        waiter = asyncio.ensure_future(started.wait())
+        pending = {first}
+        try:
+            # The hedge clock starts once the attempt holds a slot, not while it queues for one
+            await asyncio.wait({first, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait(pending, timeout=self.policy.hedge_after_sec)
+            if done:
+                return first.result()
+            if limit and self._semaphore.locked():
+                # Every slot is busy: a hedge would only queue behind real work
+                return await first
+            self.stats["hedges"] += 1
+            second = asyncio.ensure_future(self._attempt(fn, limit))
+            pending.add(second)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.stats["hedge_wins"] += task is second
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            waiter.cancel()
+            for task in pending:
+                task.cancel()
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable],
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        hedge: bool = True,
+        limit: bool = True,
+    ):
+        """
+        Await `fn()` under the service's policy.
+
+        Args:
+            fn: Zero-argument callable returning a fresh awaitable for each attempt
+            retry_on: Extra exception types to retry (e.g. an SDK's connection error)
+            hedge: Allow a hedged second attempt (only if the policy enables hedging)
+            limit: Take a concurrency slot per attempt; pass False when the caller already holds one
+        """
+        self.stats["calls"] += 1
+        hedged = hedge and self.policy.hedge_after_sec is not None
+        for attempt in range(self.policy.retries + 1):
+            try:
+                return await (self._hedged(fn, limit) if hedged else self._attempt(fn, limit))
+            except Exception as e:
+                if attempt == self.policy.retries or not (isinstance(e, retry_on) or is_retryable(e)):
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff_sec(attempt, e))
+
+    async def request(self, method: str, url: str, **kwargs):
+        """An httpx request through the pool; 4xx/5xx raise httpx.HTTPStatusError (5xx/429 after retries)."""
+        async def attempt():
+            response = await self.client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+
+        return await self.call(attempt)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_services = {}
+_services_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_service(name: str) -> Service:
+    """Process-wide Service for `name`, configured from DEFAULT_POLICIES and the environment."""
+    if name not in _services:
+        with _services_lock:
+            if name not in _services:
+                _services[name] = Service(name)
+    return _services[name]
+
+
+def service_stats() -> dict:
+    return {name: {**service.stats, "max_concurrency": service.policy.max_concurrency} for name, service in _services.items()}
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The shared I/O loop, running forever on a daemon thread."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="http-io", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro: Awaitable) -> Future:
+    """Schedule a coroutine on the I/O loop; from another event loop, `await asyncio.wrap_future(submit(...))`."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro: Awaitable, timeout: Optional[float] = None):
+    """Run a coroutine on the I/O loop and block the calling thread until it finishes."""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync called from the I/O loop itself; await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def iterate_sync(agen: AsyncIterator) -> Iterator:
+    """Iterate an async generator from sync code, one item per round trip to the I/O loop."""
+    try:
+        while True:
+            try:
+                yield run_sync(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        # Runs when the consumer stops early too, so the generator can release its slot and connection
+        run_sync(agen.aclose())
+
+
+def close_all():
+    """Close every service's connection pool."""
+    for service in list(_services.values()):
+        run_sync(service.aclose())
@@ -1,33 +1,25 @@
-import sounddevice as sd
-import scipy.io.wavfile as wav
-import threading
+# Run from the repo root: python -m backend.input.audio
 import os
 
+from backend.input.ring_capture import RingCapture
+
 # Config
 RATE = 44100
 CHANNELS = 1
 OUTPUT = os.path.join(os.path.dirname(__file__), "../../audio/recording.wav")
 
-recording = []
-stop_flag = threading.Event()
-
-def record():
-    with sd.InputStream(samplerate=RATE, channels=CHANNELS, dtype='int16') as stream:
-        while not stop_flag.is_set():
-            data, _ = stream.read(1024)
-            recording.append(data)
+# Blocks go from the audio callback into a preallocated ring buffer and are
+# streamed to the file by a writer thread, so memory does not grow with length
+capture = RingCapture(OUTPUT, sample_rate=RATE, channels=CHANNELS)
 
 print("Recording... Press 'q' + Enter to stop")
-thread = threading.Thread(target=record)
-thread.start()
+capture.start()
 
 while input() != 'q':
     pass
 
-stop_flag.set()
-thread.join()
-
-import numpy as np
-data = np.concatenate(recording)
-wav.write(OUTPUT, RATE, data)
-print(f"Saved to {OUTPUT}")
\ No newline at end of file
+capture.stop()
+print(f"Saved to {OUTPUT}")
+stats = capture.stats()
+if stats["input_overflows"] or stats["dropped_frames"]:
+    print(f"Warning: audio was lost while recording: {stats}")
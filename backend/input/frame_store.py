@@ -0,0 +1,177 @@
+"""
+Chunked on-disk store for recorded video frames.
+
+The writer streams frames into fixed-size, preallocated, memory-mapped .npy
+segments, so a recording uses one segment of page cache instead of holding
+every frame (twice) in RAM. A manifest.json next to the segments records the
+frame shape, dtype and how many frames each segment holds; it is rewritten
+every time a segment fills up, so a crashed recording loses at most the
+current segment's tail.
+
+The reader mmaps segments lazily, so analyzers can slice any range of frames
+without loading the session.
+
+Layout:
+    <directory>/manifest.json
+    <directory>/segment_00000.npy  (frames_per_segment, H, W, C)
+    <directory>/segment_00001.npy
+    ...
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+SEGMENT_TEMPLATE = "segment_{index:05d}.npy"
+
+
+class FrameStoreWriter:
+    """
+    Append frames to a chunked frame store.
+
+    Args:
+        directory: Store directory (created if missing; existing segments are overwritten)
+        frames_per_segment: Frames per preallocated segment file (300 = 10 s at 30 fps)
+        fps: Capture rate, recorded in the manifest for readers
+    """
+
+    def __init__(self, directory: str, frames_per_segment: int = 300, fps: Optional[float] = None):
+        self.directory = directory
+        self.frames_per_segment = frames_per_segment
+        self.fps = fps
+        self.frame_shape = None
+        self.dtype = None
+        self.total_frames = 0
+        self._segments = []  # frame counts of finished segments
+        self._current = None
+        self._filled = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, SEGMENT_TEMPLATE.format(index=len(self._segments)))
+        self._current = np.lib.format.open_memmap(
+            path, mode="w+", dtype=self.dtype, shape=(self.frames_per_segment, *self.frame_shape)
+        )
+        self._filled = 0
+
+    def _close_segment(self):
+        self._current.flush()
+        self._segments.append(self._filled)
+        self._current = None
+        self._write_manifest()
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments) + (self._current is not None)
+
+    def append(self, frame: np.ndarray):
+        if self.frame_shape is None:
+            self.frame_shape = tuple(frame.shape)
+            self.dtype = frame.dtype
+        elif frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match the store's {self.frame_shape}")
+        if self._current is None:
+            self._open_segment()
+        self._current[self._filled] = frame
+        self._filled += 1
+        self.total_frames += 1
+        if self._filled == self.frames_per_segment:
+            self._close_segment()
+
+    def _write_manifest(self):
+        manifest = {
+            "frame_shape": list(self.frame_shape),
+            "dtype": np.dtype(self.dtype).str,
+            "frames_per_segment": self.frames_per_segment,
+            "fps": self.fps,
+            "total_frames": sum(self._segments),
+            "segments": [
+                {"file": SEGMENT_TEMPLATE.format(index=i), "frames": count} for i, count in enumerate(self._segments)
+            ],
+        }
+        tmp_path = os.path.join(self.directory, MANIFEST + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST))
+
+    def close(self):
+        """Flush the partly filled segment and write the final manifest."""
+        if self._current is not None:
+            self._close_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameStoreReader:
+    """
+    Random access to the frames of a chunked frame store.
+
+    `reader[i]` returns a read-only view into the mapped segment; slices that
+    stay within one segment are views too, and only slices spanning segments
+    are copied.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.frame_shape = tuple(self.manifest["frame_shape"])
+        self.dtype = np.dtype(self.manifest["dtype"])
+        self.fps = self.manifest.get("fps")
+        self._counts = [segment["frames"] for segment in self.manifest["segments"]]
+        self._starts = np.cumsum([0] + self._counts)
+        self._mapped = {}
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def _segment(self, index: int) -> np.ndarray:
+        if index not in self._mapped:
+            path = os.path.join(self.directory, self.manifest["segments"][index]["file"])
+            self._mapped[index] = np.load(path, mmap_mode="r")[: self._counts[index]]
+        return self._mapped[index]
+
+    def _locate(self, frame_index: int):
+        segment = int(np.searchsorted(self._starts, frame_index, side="right")) - 1
+        return segment, frame_index - int(self._starts[segment])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return np.stack([self[i] for i in range(start, stop, step)]) if stop > start else self._empty()
+            return self.read(start, stop)
+        index = int(key)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Frame {key} out of range for {len(self)} frames")
+        segment, offset = self._locate(index)
+        return self._segment(segment)[offset]
+
+    def _empty(self) -> np.ndarray:
+        return np.empty((0, *self.frame_shape), dtype=self.dtype)
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Frames [start, stop) as one array (a view when they sit in one segment)."""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return self._empty()
+        first, first_offset = self._locate(start)
+        last, last_offset = self._locate(stop - 1)
+        if first == last:
+            return self._segment(first)[first_offset:last_offset + 1]
+        parts = [self._segment(first)[first_offset:]]
+        parts += [self._segment(i) for i in range(first + 1, last)]
+        parts.append(self._segment(last)[:last_offset + 1])
+        return np.concatenate(parts)
+
+    def __iter__(self):
+        for index in range(len(self._counts)):
+            yield from self._segment(index)
@@ -0,0 +1,221 @@
+"""
+Ring-buffer audio capture.
+
+The sounddevice callback copies each block into a preallocated ring buffer
+(no allocation, no locks); a writer thread drains it to a soundfile and hands
+the same memory to analysis callbacks. The ring is mirrored: every sample is
+stored twice, `capacity` apart, so any window of up to `capacity` frames is
+one contiguous slice and `latest()` can return a view without copying.
+
+There is one producer (the audio callback) and one consumer (the writer
+thread). Each side only ever advances its own counter, which is what makes
+the buffer safe without a lock under the GIL. If the writer falls more than
+`capacity` frames behind, the oldest unread audio is overwritten; that is
+counted, never blocked on.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Single-producer, single-consumer mirrored ring of (frames, channels) samples.
+
+    Counters:
+        overruns: writes that overwrote audio the consumer had not read yet
+        dropped_frames: frames lost to overruns: skipped by the consumer because they were
+            overwritten, plus the head of any block longer than `capacity`, which never fits
+        torn_reads: reads whose data was being overwritten while the consumer used it
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype="int16"):
+        self.capacity = capacity
+        self.channels = channels
+        self._buffer = np.zeros((2 * capacity, channels), dtype=dtype)
+        self._written = 0  # total frames ever written; only the producer changes it
+        self._read = 0  # total frames consumed; only the consumer changes it
+        self.overruns = 0
+        self.torn_reads = 0
+        # Each side counts its own losses, so neither touches a counter the other writes
+        self._skipped_frames = 0  # consumer
+        self._truncated_frames = 0  # producer
+
+    @property
+    def dropped_frames(self) -> int:
+        return self._skipped_frames + self._truncated_frames
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    def write(self, block: np.ndarray):
+        """Producer side: copy a block in. Never blocks and never allocates."""
+        n = len(block)
+        overrun = False
+        if n > self.capacity:
+            # Only the newest `capacity` frames fit; the rest are lost before anyone could read them
+            self._truncated_frames += n - self.capacity
+            overrun = True
+            block = block[-self.capacity:]
+            n = self.capacity
+        capacity = self.capacity
+        position = self._written % capacity
+        first = min(n, capacity - position)
+        rest = n - first
+        buffer = self._buffer
+        buffer[position:position + first] = block[:first]
+        buffer[position + capacity:position + capacity + first] = block[:first]
+        if rest:
+            buffer[:rest] = block[first:]
+            buffer[capacity:capacity + rest] = block[first:]
+        if overrun or self._written + n - self._read > capacity:
+            self.overruns += 1
+        self._written += n  # publish only after the samples are in place
+
+    def available(self) -> int:
+        return min(self._written - self._read, self.capacity)
+
+    def peek(self, max_frames: Optional[int] = None) -> np.ndarray:
+        """Consumer side: a view of the unread frames (oldest first). Call `advance` when done."""
+        written = self._written
+        behind = written - self._read
+        if behind > self.capacity:
+            self._skipped_frames += behind - self.capacity
+            self._read = written - self.capacity
+            behind = self.capacity
+        if max_frames is not None:
+            behind = min(behind, max_frames)
+        position = self._read % self.capacity
+        return self._buffer[position:position + behind]
+
+    def advance(self, n: int):
+        """Mark `n` peeked frames as consumed."""
+        if self._written - self._read > self.capacity:
+            # The producer lapped us while we were using the view
+            self.torn_reads += 1
+        self._read += n
+
+    def latest(self, n: int) -> np.ndarray:
+        """
+        Zero-copy view of the most recent `n` frames (at most `capacity`).
+
+        The view stays valid until the producer writes `capacity - n` more
+        frames; copy it if you need to keep it longer.
+        """
+        n = min(n, self.capacity, self._written)
+        end = self._written % self.capacity + self.capacity
+        return self._buffer[end - n:end]
+
+
+class RingCapture:
+    """
+    Record from the default input device into a file through a RingBuffer.
+
+    Args:
+        path: Output file (format from the extension, e.g. .wav)
+        sample_rate: Capture rate
+        channels: Input channels
+        dtype: Sample type from the device ("int16" is written as PCM_16)
+        buffer_sec: Ring capacity; how long the writer may stall before audio is lost
+        on_block: Called from the writer thread with each drained block (a view; copy to keep it)
+        poll_interval_sec: How often the writer thread checks the ring
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        dtype: str = "int16",
+        buffer_sec: float = 10.0,
+        on_block: Optional[Callable[[np.ndarray], None]] = None,
+        poll_interval_sec: float = 0.02,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = dtype
+        self.on_block = on_block
+        self.poll_interval_sec = poll_interval_sec
+        self.ring = RingBuffer(int(buffer_sec * sample_rate), channels, dtype)
+        self.input_overflows = 0  # reported by the device (PortAudio), before the ring
+        self.frames_written = 0
+        self._stop = threading.Event()
+        self._writer = None
+        self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.input_overflows += 1
+        self.ring.write(indata)
+
+    def _drain(self, sound_file):
+        block = self.ring.peek()
+        if not len(block):
+            return False
+        sound_file.write(block)
+        if self.on_block is not None:
+            self.on_block(block)
+        self.ring.advance(len(block))
+        self.frames_written += len(block)
+        return True
+
+    def _run_writer(self):
+        import soundfile as sf
+
+        subtype = "PCM_16" if self.dtype == "int16" else None
+        with sf.SoundFile(self.path, mode="w", samplerate=self.sample_rate, channels=self.channels, subtype=subtype) as f:
+            while not self._stop.is_set():
+                if not self._drain(f):
+                    time.sleep(self.poll_interval_sec)
+            while self._drain(f):  # whatever arrived before the stream closed
+                pass
+
+    def start(self):
+        import sounddevice as sd
+
+        self._stop.clear()
+        self._writer = threading.Thread(target=self._run_writer, name="ring-capture-writer", daemon=True)
+        self._writer.start()
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate, channels=self.channels, dtype=self.dtype, callback=self._callback
+        )
+        self._stream.start()
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def duration_sec(self) -> float:
+        return self.ring.written / self.sample_rate
+
+    def latest_seconds(self, seconds: float) -> np.ndarray:
+        """Zero-copy view of the most recent `seconds` of audio (see RingBuffer.latest)."""
+        return self.ring.latest(int(seconds * self.sample_rate))
+
+    def stats(self) -> dict:
+        return {
+            "frames_captured": self.ring.written,
+            "frames_written": self.frames_written,
+            "input_overflows": self.input_overflows,
+            "ring_overruns": self.ring.overruns,
+            "dropped_frames": self.ring.dropped_frames,
+            "torn_reads": self.ring.torn_reads,
+        }
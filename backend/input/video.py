@@ -1,18 +1,18 @@
+# Run from the repo root: python -m backend.input.video
 import cv2
-import numpy as np
 import os
 
-# Define output path
-OUTPUT = os.path.join(os.path.dirname(__file__), "../../video/video_file.array")
+from backend.input.frame_store import FrameStoreWriter
 
-# Ensure the directory exists
-os.makedirs(os.path.dirname(OUTPUT), exist_ok=True)
+# Define output path (a directory of fixed-size .npy segments plus manifest.json)
+OUTPUT = os.path.join(os.path.dirname(__file__), "../../video/video_file.frames")
 
 # Initialize video capture
 cap = cv2.VideoCapture(0)
 
-# List to store frames
-frames = []
+# Frames stream to disk segment by segment instead of piling up in memory
+fps = cap.get(cv2.CAP_PROP_FPS)
+store = FrameStoreWriter(OUTPUT, fps=fps if fps > 0 else None)
 
 print("Recording... Press 'q' + Enter to stop and save.")
 
@@ -26,7 +26,7 @@ while cap.isOpened():
         break
     
     # Store the frame
-    frames.append(frame)
+    store.append(frame)
     
     # Display the frame
     cv2.imshow('Webcam', frame)
@@ -45,11 +45,9 @@ while cap.isOpened():
 cap.release()
 cv2.destroyAllWindows()
 
-# Convert frames list to numpy array and save
-if frames:
-    frames_array = np.array(frames)
-    np.save(OUTPUT, frames_array)
-    print(f"Saved {len(frames)} frames to {OUTPUT}.npy")
-    print(f"Array shape: {frames_array.shape}")
+store.close()
+if store.total_frames:
+    print(f"Saved {store.total_frames} frames to {OUTPUT}")
+    print(f"Frame shape: {store.frame_shape}, {store.segment_count} segment(s) of up to {store.frames_per_segment} frames")
 else:
-    print("No frames captured")
\ No newline at end of file
+    print("No frames captured")
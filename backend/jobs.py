@@ -0,0 +1,209 @@
+"""
+In-process job queue for slow request work (transcription, LLM feedback).
+
+A request thread submits a job and returns its id straight away. Workers
+publish status changes and partial results as events, which clients read
+by polling the job snapshot or by following the event stream. Streamed
+pieces such as feedback tokens are replayable only while the job runs; once
+it finishes, the published events that carry the full results are all that
+is kept.
+
+The queue can be bounded: with `max_pending` set, submit() raises QueueFull
+once that many jobs are queued or running, so an upload burst is turned
+away with a retry hint instead of piling up behind the workers.
+"""
+import bisect
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED_STATES = (DONE, FAILED)
+_UNSET = object()
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when `max_pending` jobs are already queued or running."""
+
+    def __init__(self, pending: int, retry_after_sec: int):
+        super().__init__(f"Job queue is full ({pending} pending)")
+        self.pending = pending
+        self.retry_after_sec = retry_after_sec
+
+
+class Job:
+    """State of one background job plus an ordered log of the events it published."""
+
+    def __init__(self, kind: str, **fields):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.stage = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.fields = dict(fields)
+        self.events = []  # [(seq, name, payload)], seq starts at 1; emitted events are dropped at the end
+        self.last_seq = 0
+        self._emitted = set()  # seqs of emit() events still in self.events
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def publish(self, event: str, status: Optional[str] = None, stage=_UNSET, **fields):
+        """Record new fields and append an event; wakes up every waiting stream."""
+        with self._cond:
+            if status is not None:
+                self.status = status
+            if stage is not _UNSET:
+                self.stage = stage
+            self.fields.update(fields)
+            self.updated_at = time.time()
+            payload = {"status": self.status, "stage": self.stage, **fields}
+            self._append(event, payload)
+            if self.finished and self._emitted:
+                # A finished job is retained for polling; thousands of one-token events are not worth replaying
+                self.events = [e for e in self.events if e[0] not in self._emitted]
+                self._emitted.clear()
+            self._cond.notify_all()
+
+    def emit(self, event: str, **payload):
+        """
+        Append an event without storing its payload in the job snapshot (e.g. streamed tokens).
+        It can be replayed until the job finishes, then it is dropped from the log.
+        """
+        with self._cond:
+            self.updated_at = time.time()
+            self._append(event, {"status": self.status, "stage": self.stage, **payload})
+            self._emitted.add(self.last_seq)
+            self._cond.notify_all()
+
+    def _append(self, event: str, payload: dict):
+        self.last_seq += 1
+        self.events.append((self.last_seq, event, payload))
+
+    def fail(self, error: str):
+        self.error = error
+        self.publish("error", status=FAILED, stage=None, error=error)
+
+    def events_after(self, seq: int, timeout: Optional[float] = None):
+        """Events with a sequence number above `seq`, waiting up to `timeout` for new ones."""
+        with self._cond:
+            if self.last_seq <= seq and not self.finished:
+                self._cond.wait(timeout=timeout)
+            # Sequence numbers have gaps once emitted events are dropped, so search rather than index
+            return self.events[bisect.bisect_right(self.events, seq, key=itemgetter(0)):]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.finished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+        return True
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "stage": self.stage,
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+                **self.fields,
+            }
+
+
+class JobQueue:
+    """
+    Runs jobs on a worker pool and keeps the most recent ones for lookups.
+
+    Args:
+        max_workers: Jobs that may run at once
+        max_retained: Finished jobs kept in memory for polling before the oldest are dropped
+        max_pending: Jobs that may be queued or running before submit() raises QueueFull (None: unbounded)
+    """
+
+    def __init__(self, max_workers: int = 4, max_retained: int = 256, max_pending: Optional[int] = None):
+        self.max_workers = max_workers
+        self.max_retained = max_retained
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._durations = deque(maxlen=32)  # seconds taken by recent jobs, for Retry-After
+
+    def full(self) -> bool:
+        return self.max_pending is not None and self._pending >= self.max_pending
+
+    def retry_after_sec(self) -> int:
+        """Rough wait until a slot frees up: the mean job time, scaled by how many jobs are ahead per worker."""
+        mean = sum(self._durations) / len(self._durations) if self._durations else 5.0
+        waves = max(1, self._pending - self.max_workers + 1) / self.max_workers
+        return max(1, math.ceil(mean * waves))
+
+    def submit(self, kind: str, work: Callable[[Job], None], **fields) -> Job:
+        """Queue `work(job)`; it reports progress through job.publish(). Raises QueueFull when bounded and full."""
+        job = Job(kind, **fields)
+        with self._lock:
+            if self.full():
+                self._rejected += 1
+                raise QueueFull(self._pending, self.retry_after_sec())
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "workers": self.max_workers,
+                "rejected": self._rejected,
+                "retained": len(self._jobs),
+            }
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, work: Callable[[Job], None]):
+        start = time.monotonic()
+        try:
+            job.publish("status", status=RUNNING)
+            try:
+                work(job)
+            except Exception as e:
+                print(f'Job {job.id} failed: {e}')
+                job.fail(str(e))
+                return
+            if not job.finished:
+                job.publish("done", status=DONE, stage=None)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._durations.append(time.monotonic() - start)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(self._jobs) - self.max_retained)]:
+            del self._jobs[job_id]
@@ -0,0 +1,110 @@
+"""
+Adaptive keyframe selection for the video analyzer.
+
+Instead of keeping every Nth camera frame, keep a frame only when it differs
+enough from the last frame kept. Signatures are computed on tiny grayscale
+thumbnails, so one comparison is far cheaper than encoding a frame. A frame
+budget caps how many frames (and so VLM image tokens) a session can send, and
+a maximum interval makes sure a speaker who stands still is still sampled now
+and then.
+"""
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Default change thresholds per method, on each method's 0..1 distance scale
+DEFAULT_THRESHOLDS = {
+    "diff": 0.035,  # mean absolute pixel difference
+    "hist": 0.20,  # Bhattacharyya distance between hue/saturation histograms
+    "dhash": 0.12,  # fraction of differing bits in a 64-bit difference hash
+}
+DIFF_SIZE = (32, 24)
+
+
+def frame_signature(frame: np.ndarray, method: str = "diff") -> np.ndarray:
+    """Cheap signature of a BGR frame for the given distance method."""
+    if method == "hist":
+        hsv = cv2.cvtColor(cv2.resize(frame, (80, 60), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256])
+        return cv2.normalize(hist, hist).flatten()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if method == "dhash":
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        return (small[:, 1:] > small[:, :-1]).flatten()
+    if method == "diff":
+        return cv2.resize(gray, DIFF_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+    raise ValueError(f"Unknown keyframe method '{method}'. Choose one of: {', '.join(DEFAULT_THRESHOLDS)}")
+
+
+def signature_distance(a: np.ndarray, b: np.ndarray, method: str = "diff") -> float:
+    """Distance between two signatures, 0 (identical) to roughly 1."""
+    if method == "hist":
+        return float(cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA))
+    if method == "dhash":
+        return float(np.count_nonzero(a != b)) / a.size
+    return float(np.mean(np.abs(a - b)))
+
+
+class KeyframeSelector:
+    """
+    Decide frame by frame whether a camera frame is worth sending to the VLM.
+
+    Args:
+        method: "diff" (thumbnail difference), "hist" (color histogram) or "dhash" (perceptual hash)
+        threshold: Minimum distance from the last kept frame (default per method)
+        min_interval_sec: Never keep two frames closer together than this
+        max_interval_sec: Always keep a frame after this long without one (None disables)
+        max_frames: Frame budget for the session; the threshold rises as the budget is used up
+        expected_duration_sec: Session length used to pace the budget
+    """
+
+    def __init__(
+        self,
+        method: str = "diff",
+        threshold: Optional[float] = None,
+        min_interval_sec: float = 0.25,
+        max_interval_sec: Optional[float] = 5.0,
+        max_frames: Optional[int] = None,
+        expected_duration_sec: Optional[float] = None,
+    ):
+        if method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"Unknown keyframe method '{method}'. Choose one of: {', '.join(DEFAULT_THRESHOLDS)}")
+        self.method = method
+        self.threshold = threshold if threshold is not None else DEFAULT_THRESHOLDS[method]
+        self.min_interval_sec = min_interval_sec
+        self.max_interval_sec = max_interval_sec
+        self.max_frames = max_frames
+        self.expected_duration_sec = expected_duration_sec
+        self.offered = 0
+        self.kept = 0
+        self._last_signature = None
+        self._last_kept_at = None
+
+    def _effective_threshold(self, timestamp: float) -> float:
+        """Raise the bar when frames are being kept faster than the budget allows."""
+        if not self.max_frames or not self.expected_duration_sec or timestamp <= 0:
+            return self.threshold
+        allowed_so_far = self.max_frames * min(1.0, timestamp / self.expected_duration_sec)
+        ahead = self.kept / max(allowed_so_far, 1.0)
+        return self.threshold * max(1.0, ahead) ** 2
+
+    def offer(self, frame: np.ndarray, timestamp: float) -> bool:
+        """Return True if `frame`, captured at `timestamp` seconds, should be kept."""
+        self.offered += 1
+        if self.max_frames is not None and self.kept >= self.max_frames:
+            return False
+        if self._last_kept_at is not None and timestamp - self._last_kept_at < self.min_interval_sec:
+            return False
+
+        signature = frame_signature(frame, self.method)
+        keep = (
+            self._last_signature is None
+            or (self.max_interval_sec is not None and timestamp - self._last_kept_at >= self.max_interval_sec)
+            or signature_distance(signature, self._last_signature, self.method) >= self._effective_threshold(timestamp)
+        )
+        if keep:
+            self._last_signature = signature
+            self._last_kept_at = timestamp
+            self.kept += 1
+        return keep
@@ -0,0 +1,217 @@
+"""
+Incremental prosody analysis for live coaching.
+
+Feed PCM blocks as they arrive from sounddevice and ask for a partial
+assessment at any time. Only running statistics and a one-frame tail of
+audio are kept, so memory stays constant no matter how long the speech is.
+"""
+import numpy as np
+
+from backend.audio_analysis import assess
+
+PITCH_REFERENCE_HZ = 100.0  # semitone reference; the SD does not depend on it
+
+
+class RunningStats:
+    """Welford mean/variance that can absorb whole batches at once (Chan et al. merge)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = values.size
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.square(values - batch_mean).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+
+class IncrementalProsodyAnalyzer:
+    """
+    Running pitch, loudness and onset-rate estimates over a PCM stream.
+
+    Args:
+        sample_rate: Sample rate of the incoming blocks
+        frame_ms: Analysis frame length
+        hop_ms: Hop between consecutive frames
+        fmin: Lowest pitch considered voiced (Hz), same range as analyze_speech
+        fmax: Highest pitch considered voiced (Hz)
+        voicing_threshold: Minimum normalized autocorrelation peak for a voiced frame
+        silence_db: Frames quieter than this (dBFS) are never voiced and never onsets
+        min_onset_gap_ms: Refractory period between two syllable onsets
+        min_duration_sec: Audio needed before assessment() returns a sentence
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: float = 40.0,
+        hop_ms: float = 20.0,
+        fmin: float = 50.0,
+        fmax: float = 500.0,
+        voicing_threshold: float = 0.45,
+        silence_db: float = -50.0,
+        min_onset_gap_ms: float = 100.0,
+        min_duration_sec: float = 3.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.hop_length = int(sample_rate * hop_ms / 1000)
+        self.min_lag = max(1, int(sample_rate / fmax))
+        self.max_lag = min(self.frame_length - 1, int(np.ceil(sample_rate / fmin)))
+        self.voicing_threshold = voicing_threshold
+        self.silence_power = 10 ** (silence_db / 10)
+        self.min_onset_gap = max(1, int(round(min_onset_gap_ms / hop_ms)))
+        self.min_duration_sec = min_duration_sec
+
+        self._window = np.hanning(self.frame_length).astype(np.float32)
+        self._nfft = 1 << int(np.ceil(np.log2(2 * self.frame_length)))
+        # Leftover samples that did not fill a whole hop yet (bounded by one frame)
+        self._tail = np.zeros(0, dtype=np.float32)
+
+        self.samples_seen = 0
+        self._sum_squares = 0.0
+        self.pitch_st = RunningStats()
+        self.frame_db = RunningStats()
+
+        # Onset detector state: previous spectrum, last two flux values and adaptive threshold
+        self._prev_spectrum = None
+        self._flux_history = [0.0, 0.0]
+        self._flux_mean = 0.0
+        self._flux_var = 0.0
+        self._frames_since_onset = self.min_onset_gap
+        self.onset_count = 0
+
+    # ----- Input -----
+
+    def push(self, block):
+        """Add a block of PCM samples (int16 or float, mono or (frames, channels))."""
+        block = np.asarray(block)
+        if block.ndim == 2:
+            block = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+        if block.dtype == np.int16:
+            block = block.astype(np.float32) * np.float32(1.0 / 32768.0)
+        else:
+            block = block.astype(np.float32, copy=False)
+        if block.size == 0:
+            return
+
+        self.samples_seen += block.size
+        self._sum_squares += float(np.dot(block, block))
+
+        buffer = np.concatenate((self._tail, block)) if self._tail.size else block
+        n_frames = 1 + (buffer.size - self.frame_length) // self.hop_length if buffer.size >= self.frame_length else 0
+        if n_frames > 0:
+            frames = np.lib.stride_tricks.sliding_window_view(buffer, self.frame_length)[::self.hop_length][:n_frames]
+            self._process_frames(frames)
+            buffer = buffer[n_frames * self.hop_length:]
+        self._tail = np.array(buffer, dtype=np.float32, copy=True)
+
+    def _process_frames(self, frames):
+        power = np.mean(np.square(frames, dtype=np.float64), axis=1)
+        loud = power > self.silence_power
+        self.frame_db.update(10 * np.log10(power[loud]))
+
+        windowed = frames * self._window
+        spectrum = np.fft.rfft(windowed, n=self._nfft, axis=1)
+        magnitude = np.abs(spectrum)
+
+        self._update_pitch(magnitude, loud)
+        self._update_onsets(np.log1p(magnitude), loud)
+
+    def _update_pitch(self, magnitude, loud):
+        # Autocorrelation through the power spectrum, normalized by lag 0
+        acf = np.fft.irfft(np.square(magnitude), n=self._nfft, axis=1)[:, : self.max_lag + 1]
+        energy = acf[:, 0]
+        valid = loud & (energy > 0)
+        if not np.any(valid):
+            return
+        acf = acf[valid] / energy[valid, None]
+        search = acf[:, self.min_lag : self.max_lag + 1]
+        peak = np.argmax(search, axis=1)
+        strength = search[np.arange(len(search)), peak]
+        lag = (peak + self.min_lag).astype(np.float64)
+
+        # Parabolic interpolation around the peak for sub-sample lag accuracy
+        inner = (peak > 0) & (peak < search.shape[1] - 1)
+        rows = np.nonzero(inner)[0]
+        if rows.size:
+            left = search[rows, peak[rows] - 1]
+            centre = search[rows, peak[rows]]
+            right = search[rows, peak[rows] + 1]
+            denom = left - 2 * centre + right
+            shift = np.where(denom != 0, 0.5 * (left - right) / np.where(denom != 0, denom, 1), 0.0)
+            lag[rows] += shift
+
+        voiced = strength > self.voicing_threshold
+        f0 = self.sample_rate / lag[voiced]
+        f0 = f0[(f0 > 50) & (f0 < 500)]
+        self.pitch_st.update(12 * np.log2(f0 / PITCH_REFERENCE_HZ))
+
+    def _update_onsets(self, log_magnitude, loud):
+        for spectrum, is_loud in zip(log_magnitude, loud):
+            if self._prev_spectrum is None:
+                self._prev_spectrum = spectrum
+                continue
+            flux = float(np.maximum(spectrum - self._prev_spectrum, 0).sum())
+            self._prev_spectrum = spectrum
+
+            # Peak picking on the previous value: it is a local max and clears the adaptive threshold
+            before, candidate = self._flux_history
+            threshold = self._flux_mean + 1.5 * np.sqrt(self._flux_var)
+            self._frames_since_onset += 1
+            if (is_loud and candidate > before and candidate >= flux and candidate > threshold
+                    and self._frames_since_onset >= self.min_onset_gap):
+                self.onset_count += 1
+                self._frames_since_onset = 0
+            self._flux_history = [candidate, flux]
+
+            # Exponential moving mean/variance keeps the threshold adaptive in O(1) memory
+            alpha = 0.05
+            delta = flux - self._flux_mean
+            self._flux_mean += alpha * delta
+            self._flux_var = (1 - alpha) * (self._flux_var + alpha * delta * delta)
+
+    # ----- Output -----
+
+    @property
+    def duration_sec(self) -> float:
+        return self.samples_seen / float(self.sample_rate)
+
+    def snapshot(self):
+        """Current metrics, with the same keys as audio_analysis.compute_metrics where they overlap."""
+        duration = self.duration_sec
+        mean_power = self._sum_squares / self.samples_seen if self.samples_seen else 0.0
+        return {
+            "duration_sec": duration,
+            "pitch_mean_st": self.pitch_st.mean,
+            "pitch_sd_st": self.pitch_st.std,
+            "voiced_frames": self.pitch_st.count,
+            "loudness_db": 10 * np.log10(mean_power) if mean_power > 0 else float("-inf"),
+            "loudness_sd": self.frame_db.std,
+            "onsets": self.onset_count,
+            "words_per_minute": (self.onset_count / 2.0) / (duration / 60) if duration else 0.0,
+        }
+
+    def assessment(self):
+        """Partial coaching sentence, or None until min_duration_sec of audio was seen."""
+        if self.duration_sec < self.min_duration_sec:
+            return None
+        metrics = self.snapshot()
+        return assess(metrics["pitch_sd_st"], metrics["words_per_minute"], metrics["loudness_db"])
@@ -0,0 +1,180 @@
+"""
+Long-form transcription for full-length speeches.
+
+Audio is cut at the quietest point near every chunk boundary, with a short
+overlap centred on that pause. All chunks go to the transcription backend at
+once, and the timestamped segments are shifted back onto the speech timeline.
+In each overlap, the chunk that owns the cut point keeps its words. A chunk
+that keeps failing is reported in `failed_chunks` and the rest of the speech
+is still returned.
+"""
+import re
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from backend.audio_io import DecodedAudio, decode_audio_bytes, encode_wav_bytes, load_audio
+from backend.transcription import TranscriptionClient, TranscriptionResult, get_client
+
+LONGFORM_THRESHOLD_SEC = 60.0  # shorter recordings go through as one request
+TARGET_CHUNK_SEC = 25.0  # stays inside Whisper's 30 s window
+OVERLAP_SEC = 1.0
+SEARCH_SEC = 6.0  # how far before the target end to look for a pause
+FRAME_MS = 20.0
+MAX_ATTEMPTS = 2
+MAX_OVERLAP_WORDS = 8
+
+
+def plan_chunks(
+    samples: np.ndarray,
+    sample_rate: int,
+    target_sec: float = TARGET_CHUNK_SEC,
+    overlap_sec: float = OVERLAP_SEC,
+    search_sec: float = SEARCH_SEC,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Split a signal into overlapping chunks whose boundaries sit in pauses.
+
+    Returns:
+        List of (start, end, own_start, own_end) sample indices. [start, end) is
+        sent to the backend; [own_start, own_end) is the part of the timeline the
+        chunk is responsible for when overlaps are merged.
+    """
+    n = len(samples)
+    target = int(target_sec * sample_rate)
+    if n <= target:
+        return [(0, n, 0, n)]
+
+    hop = max(1, int(sample_rate * FRAME_MS / 1000))
+    n_frames = n // hop
+    energy = np.square(samples[: n_frames * hop].reshape(n_frames, hop), dtype=np.float64).mean(axis=1)
+    half_overlap = int(overlap_sec * sample_rate / 2)
+    search = int(search_sec * sample_rate)
+
+    cuts = []
+    pos = 0
+    while n - pos > target:
+        ideal = pos + target
+        lo = max(pos + half_overlap + hop, ideal - search) // hop
+        hi = min(ideal // hop, n_frames)
+        cut = (lo + int(np.argmin(energy[lo:hi]))) * hop if hi > lo else ideal
+        cuts.append(cut)
+        pos = cut
+
+    bounds = [0] + cuts + [n]
+    return [
+        (max(0, own_start - half_overlap), min(n, own_end + half_overlap), own_start, own_end)
+        for own_start, own_end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _drop_repeated_prefix(previous_words: List[str], words: List[str]) -> List[str]:
+    """
+    Remove the longest prefix of `words` that repeats the tail of `previous_words`.
+
+    Single-word matches are ignored; they are too often a genuine repeat ("the", "and").
+    """
+    limit = min(MAX_OVERLAP_WORDS, len(previous_words), len(words))
+    tail = [_normalize(w) for w in previous_words[-limit:]]
+    head = [_normalize(w) for w in words[:limit]]
+    for size in range(limit, 1, -1):
+        if tail[-size:] == head[:size]:
+            return words[size:]
+    return words
+
+
+def merge_chunk_results(spans, results: List[Optional[TranscriptionResult]], sample_rate: int):
+    """
+    Stitch per-chunk results into one timeline.
+
+    Segments with timestamps are kept by the chunk whose owned range contains the
+    segment midpoint. Chunks without timestamps fall back to text matching at the seams.
+    """
+    segments = []
+    words: List[str] = []
+    for i, ((start, end, own_start, own_end), result) in enumerate(zip(spans, results)):
+        if result is None:
+            continue
+        is_last = i == len(spans) - 1
+        offset = start / sample_rate
+        own_lo, own_hi = own_start / sample_rate, own_end / sample_rate
+        timed = [c for c in result.chunks if c.get("timestamp") and c["timestamp"][0] is not None]
+
+        if timed:
+            for c in timed:
+                seg_start, seg_end = c["timestamp"]
+                seg_start = offset + seg_start
+                seg_end = offset + (seg_end if seg_end is not None else (end - start) / sample_rate)
+                midpoint = (seg_start + seg_end) / 2
+                if own_lo <= midpoint and (midpoint < own_hi or is_last):
+                    segments.append({"text": c["text"].strip(), "timestamp": (round(seg_start, 2), round(seg_end, 2))})
+                    words.extend(c["text"].split())
+        else:
+            words.extend(_drop_repeated_prefix(words, result.text.split()))
+    return " ".join(words), segments
+
+
+def transcribe_long(
+    audio,
+    client: Optional[TranscriptionClient] = None,
+    target_sec: float = TARGET_CHUNK_SEC,
+    overlap_sec: float = OVERLAP_SEC,
+    max_attempts: int = MAX_ATTEMPTS,
+    timeout: Optional[float] = None,
+) -> TranscriptionResult:
+    """
+    Transcribe a long recording as concurrent overlapping chunks.
+
+    Args:
+        audio: WAV bytes, a file path, or a DecodedAudio
+        client: TranscriptionClient to dispatch chunks on (default: the process-wide client)
+        target_sec: Nominal chunk length
+        overlap_sec: Audio shared by neighbouring chunks, centred on the cut point
+        max_attempts: Tries per chunk before it is reported as failed
+        timeout: Per-chunk timeout in seconds
+
+    Returns:
+        TranscriptionResult with stitched text, timeline-relative segments and any failed chunks
+    """
+    client = client or get_client()
+    if isinstance(audio, (bytes, bytearray)):
+        audio = decode_audio_bytes(audio)
+    elif not isinstance(audio, DecodedAudio):
+        audio = load_audio(audio)
+
+    start_time = time.perf_counter()
+    sr = audio.sample_rate
+    spans = plan_chunks(audio.samples, sr, target_sec=target_sec, overlap_sec=overlap_sec)
+    payloads = [encode_wav_bytes(audio.samples[start:end], sr) for start, end, _, _ in spans]
+
+    pending = {i: client.submit(payload, return_timestamps=True) for i, payload in enumerate(payloads)}
+    results: List[Optional[TranscriptionResult]] = [None] * len(spans)
+    attempts = {i: 1 for i in pending}
+    while pending:
+        retry = {}
+        for i, future in pending.items():
+            try:
+                results[i] = future.result(timeout=timeout)
+            except Exception as e:
+                if attempts[i] < max_attempts:
+                    attempts[i] += 1
+                    retry[i] = client.submit(payloads[i], return_timestamps=True)
+                else:
+                    print(f"Chunk {i} ({spans[i][0] / sr:.1f}-{spans[i][1] / sr:.1f}s) failed: {e}")
+        pending = retry
+
+    text, segments = merge_chunk_results(spans, results, sr)
+    return TranscriptionResult(
+        text=text,
+        chunks=segments,
+        backend=getattr(client.backend, "name", type(client.backend).__name__),
+        elapsed_sec=time.perf_counter() - start_time,
+        failed_chunks=[
+            (round(spans[i][0] / sr, 2), round(spans[i][1] / sr, 2)) for i, r in enumerate(results) if r is None
+        ],
+    )
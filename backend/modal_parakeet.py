@@ -2,13 +2,18 @@ from typing import Optional
 
 import modal
 from pathlib import Path
-import tempfile
+import os
 # import ffmpeg
 
 MODEL_DIR = "/model"
 MODEL_NAME = "openai/whisper-large-v3"
 MODEL_REVISION = "afda370583db9c5359511ed5d989400a6199dfe1"
 
+# Micro-batching: concurrent transcribe_bytes calls are grouped for up to
+# BATCH_WAIT_MS (or until BATCH_SIZE clips are waiting) and run as one pipeline call
+BATCH_SIZE = int(os.environ.get("ASR_BATCH_SIZE", 8))
+BATCH_WAIT_MS = float(os.environ.get("ASR_BATCH_WAIT_MS", 50))
+
 image = (
     modal.Image.debian_slim(python_version="3.11")
     .apt_install("ffmpeg")                 
@@ -24,6 +29,7 @@ image = (
         "datasets==3.2.0",
     )
     .env({"HF_HUB_ENABLE_HF_TRANSFER": "1", "HF_HUB_CACHE": MODEL_DIR})
+    .add_local_python_source("backend")
 )
 
 model_cache = modal.Volume.from_name("hf-hub-cache", create_if_missing=True)
@@ -33,6 +39,7 @@ app = modal.App(
 )
 
 @app.cls(gpu="a10g")
+@modal.concurrent(max_inputs=4 * BATCH_SIZE)  # let enough calls land at once to fill a batch
 class Model:
     @modal.enter()
     def load_model(self):
@@ -53,16 +60,52 @@ class Model:
             torch_dtype=torch.float16,
             device="cuda",
         )
+        from backend.batching import MicroBatcher
+
+        # One batcher per timestamp mode, since return_timestamps applies to a whole pipeline call
+        self.batchers = {
+            return_timestamps: MicroBatcher(
+                lambda inputs, ts=return_timestamps: self._transcribe_batch(inputs, ts),
+                max_batch_size=BATCH_SIZE,
+                max_wait_ms=BATCH_WAIT_MS,
+            )
+            for return_timestamps in (False, True)
+        }
+
+    def _to_pipeline_input(self, wav_bytes: bytes, sample_rate: Optional[int] = None):
+        """Decode WAV (or raw int16 PCM) bytes in memory into the dict the ASR pipeline accepts."""
+        import librosa
+        from backend.audio_io import decode_audio_bytes
+
+        audio = decode_audio_bytes(wav_bytes, sample_rate=sample_rate)
+        target_rate = self.processor.feature_extractor.sampling_rate
+        samples = audio.samples
+        if audio.sample_rate != target_rate:
+            samples = librosa.resample(samples, orig_sr=audio.sample_rate, target_sr=target_rate)
+        return {"raw": samples, "sampling_rate": target_rate}
+
+    def _transcribe_batch(self, inputs, return_timestamps: bool = False):
+        return self.pipeline(inputs, batch_size=len(inputs), return_timestamps=return_timestamps)
 
     # @modal.method()
     # def transcribe_file(self, file_path: str):
     #     return self.pipeline(file_path)
     @modal.method()
-    def transcribe_bytes(self, wav_bytes: bytes):
-        with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
-            tmp.write(wav_bytes)
-            tmp.flush()
-            return self.pipeline(tmp.name)
+    def transcribe_bytes(self, wav_bytes: bytes, sample_rate: Optional[int] = None, return_timestamps: bool = False):
+        # Decoding happens on the caller's thread so the batch worker only runs the model
+        return self.batchers[return_timestamps].run(self._to_pipeline_input(wav_bytes, sample_rate))
+
+    @modal.method()
+    def batch_stats(self):
+        return {
+            ("timestamps" if return_timestamps else "text"): batcher.stats.summary()
+            for return_timestamps, batcher in self.batchers.items()
+        }
+
+    @modal.exit()
+    def stop_batcher(self):
+        for batcher in self.batchers.values():
+            batcher.close()
 
 @app.local_entrypoint()
 def transcribe_audio(file_path: str = "audiotests/user_recording.wav"):
@@ -71,3 +114,4 @@ def transcribe_audio(file_path: str = "audiotests/user_recording.wav"):
     return result["text"]
 
 # RUN COMMAND: python -m modal run backend.modal_parakeet --file-path audiotests/user_recording.wav
+# DEPLOY COMMAND (used by backend/transcription.py): python -m modal deploy backend/modal_parakeet.py
@@ -0,0 +1,260 @@
+"""
+Fan-out analysis of one practice session: prosody, transcription and video at once.
+
+The recording is decoded and run through the VAD once, then three branches
+start together:
+
+    prosody        audio_analysis on a process pool (parselmouth/librosa are CPU-bound)
+    transcription  get_transcript on a thread (the ASR call is remote)
+    video          the session's frames posted to the VLM endpoint on the shared I/O loop
+
+Feedback needs the transcript and is better with the other two, so the LLM
+starts once every branch has finished or failed, with one merged context.
+End-to-end time is about the slowest branch plus the LLM instead of the sum
+of all stages. Each stage's wall time is reported in `timings`.
+
+    SPEAKEASY_PROSODY_WORKERS=2
+    SPEAKEASY_VLM_URL=<analyze_video endpoint>  (frames are ignored without it)
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from backend.audio_io import decode_audio_bytes
+from backend.vad import SpeechSegments, detect_speech
+
+BRANCHES = ("prosody", "transcript", "video")
+
+
+@dataclass
+class Session:
+    """One practice attempt: the WAV upload plus optional JPEG frames of the speaker."""
+    audio_bytes: bytes
+    frames: List[bytes] = field(default_factory=list)
+    question: Optional[str] = None  # VLM question (default: the rating_schema rubric)
+
+
+def prosody_report(wav_bytes: bytes, speech: Optional[SpeechSegments] = None) -> dict:
+    """Prosody metrics plus the coaching sentence. Runs in a worker process."""
+    from backend.audio_analysis import assess, compute_metrics
+
+    metrics = compute_metrics(decode_audio_bytes(wav_bytes), speech=speech)
+    metrics["summary"] = assess(metrics["pitch_sd_st"], metrics["words_per_minute"], metrics["loudness_db"])
+    return metrics
+
+
+def warm_prosody_worker() -> float:
+    """Import the prosody stack and run it once on a short tone, so first-call JIT work is done. Runs in a worker."""
+    import numpy as np
+
+    from backend.audio_io import encode_wav_bytes
+
+    start = time.perf_counter()
+    t = np.arange(16000) / 16000
+    prosody_report(encode_wav_bytes((0.3 * np.sin(2 * np.pi * 180 * t)).astype(np.float32), 16000))
+    return time.perf_counter() - start
+
+
+def build_feedback_context(transcript: str, prosody: Optional[dict] = None, video: Optional[dict] = None) -> str:
+    """The single user message the LLM sees: transcript, then whatever delivery analysis succeeded."""
+    sections = [f"Transcript:\n{transcript}"]
+    if prosody:
+        # Unmeasurable values (no voiced frames, digital silence) are None and left out
+        lines = [f"- {prosody['summary']}"]
+        if prosody.get("words_per_minute") is not None:
+            lines.append(f"- Speaking rate: {prosody['words_per_minute']:.0f} words per minute")
+        if prosody.get("pitch_sd_st") is not None:
+            lines.append(f"- Pitch variation: {prosody['pitch_sd_st']:.1f} semitones")
+        if prosody.get("loudness_db") is not None:
+            lines.append(f"- Loudness: {prosody['loudness_db']:.1f} dBFS")
+        lines.append(f"- Pauses: {prosody.get('pause_count', 0)} (longest {prosody.get('longest_pause_sec', 0.0):.1f} s)")
+        sections.append("Vocal delivery (measured from the audio):\n" + "\n".join(lines))
+    if video:
+        parts = []
+        if video.get("rating_summary"):
+            parts.append(f"Ratings across {video.get('frames_processed', 0)} frames: {json.dumps(video['rating_summary'])}")
+        if video.get("combined_analysis"):
+            parts.append(video["combined_analysis"])
+        if parts:
+            sections.append("Body language (from video frames):\n" + "\n".join(parts))
+    if len(sections) > 1:
+        sections.append("Include the vocal delivery and body language in your feedback.")
+    return "\n\n".join(sections)
+
+
+class Orchestrator:
+    """
+    Runs the branches of a session concurrently, then the LLM on their merged output.
+
+    Args:
+        prosody_workers: Processes for prosody analysis
+        vlm_url: analyze_video endpoint; sessions with frames skip video analysis without it
+        prosody_fn: Picklable `fn(wav_bytes, speech) -> dict` run in the process pool
+        io_workers: Threads waiting on transcription
+    """
+
+    def __init__(
+        self,
+        prosody_workers: int = 2,
+        vlm_url: Optional[str] = None,
+        prosody_fn: Callable = prosody_report,
+        io_workers: int = 8,
+    ):
+        self.prosody_workers = prosody_workers
+        self.vlm_url = vlm_url
+        self.prosody_fn = prosody_fn
+        self._threads = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="session")
+        self._processes = None
+        self._lock = threading.Lock()
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            with self._lock:
+                if self._processes is None:
+                    # spawn, not fork: the server process has live threads (job workers, the I/O loop)
+                    self._processes = ProcessPoolExecutor(
+                        max_workers=self.prosody_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._processes
+
+    def _discard_process_pool(self, pool: ProcessPoolExecutor):
+        # A worker died (e.g. killed for memory); the next session gets a fresh pool
+        with self._lock:
+            if self._processes is pool:
+                self._processes = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """Start every prosody worker process and preload its imports; returns once they are all ready."""
+        pool = self._process_pool()
+        for future in [pool.submit(warm_prosody_worker) for _ in range(self.prosody_workers)]:
+            future.result()
+
+    def _submit_video(self, session: Session):
+        from backend.frame_codec import post_frames_async
+        from backend.http_clients import submit
+        from backend.rating_schema import build_question
+
+        structured = session.question is None
+        header = {
+            "session_id": uuid.uuid4().hex,
+            "chunk_index": 0,
+            "final": True,
+            "question": build_question() if structured else session.question,
+            "structured": structured,
+        }
+        return submit(post_frames_async(self.vlm_url, header, session.frames))
+
+    def run(self, session: Session, on_event: Optional[Callable[..., None]] = None) -> dict:
+        """
+        Analyze a session and stream feedback.
+
+        Args:
+            session: Audio and optional frames
+            on_event: Called as `on_event(name, **fields)` for "status", "prosody", "transcript",
+                "video", "feedback_delta" and "feedback", in the order they happen
+
+        Returns:
+            Dict with speech, prosody, transcript, video, feedback, errors and timings (seconds).
+            Feedback is None when transcription or the LLM failed; a failed stage's error is
+            in `errors` under its name, and the other results are still returned.
+        """
+        from backend.stt_llm_tts import get_transcript, stream_feedback_from_transcript
+
+        emit = on_event or (lambda name, **fields: None)
+        result = {name: None for name in ("speech", *BRANCHES, "feedback")}
+        errors, timings = {}, {}
+        start = time.perf_counter()
+
+        # Decode and find the speech once; every branch shares it
+        try:
+            decoded = decode_audio_bytes(session.audio_bytes)
+            speech = detect_speech(decoded.samples, decoded.sample_rate)
+            result["speech"] = speech.stats()
+        except Exception as e:
+            print(f"Speech detection skipped: {e}")
+            decoded = speech = None
+        timings["speech_detection"] = time.perf_counter() - start
+
+        emit("status", stage="analyzing")
+        fan_out = time.perf_counter()
+        finished_at = {}
+        pool = self._process_pool()
+        futures = {
+            pool.submit(self.prosody_fn, session.audio_bytes, speech): "prosody",
+            self._threads.submit(get_transcript, session.audio_bytes, decoded, speech): "transcript",
+        }
+        if session.frames and self.vlm_url:
+            futures[self._submit_video(session)] = "video"
+        for future, name in futures.items():
+            future.add_done_callback(lambda f, name=name: finished_at.setdefault(name, time.perf_counter()))
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result[name] = future.result()
+            except BrokenProcessPool as e:
+                print(f"Session {name} failed: {e}")
+                errors[name] = str(e)
+                self._discard_process_pool(pool)
+            except Exception as e:
+                print(f"Session {name} failed: {e}")
+                errors[name] = str(e)
+            timings[name] = finished_at.get(name, time.perf_counter()) - fan_out
+            if result[name]:
+                emit(name, **{name: result[name]})
+        timings["branches"] = time.perf_counter() - fan_out
+        timings["branches_sum"] = sum(timings[name] for name in futures.values())
+
+        if result["transcript"]:
+            emit("status", stage="generating_feedback")
+            context = build_feedback_context(result["transcript"], result["prosody"], result["video"])
+            feedback_start = time.perf_counter()
+            metrics, parts = {}, []
+            try:
+                for delta in stream_feedback_from_transcript(context, metrics=metrics):
+                    parts.append(delta)
+                    emit("feedback_delta", text=delta)
+                result["feedback"] = "".join(parts)
+            except Exception as e:
+                print(f"Session feedback failed: {e}")
+                errors["feedback"] = str(e)
+            timings["feedback_first_token"] = metrics.get("ttft_sec")
+            timings["feedback"] = time.perf_counter() - feedback_start
+
+        timings["total"] = time.perf_counter() - start
+        result["errors"] = errors
+        result["timings"] = {name: round(sec, 3) for name, sec in timings.items() if sec is not None}
+        if result["feedback"] is not None:
+            emit("feedback", feedback=result["feedback"], timings=result["timings"])
+        print("Session timings: " + ", ".join(f"{name} {sec:.2f}s" for name, sec in result["timings"].items()))
+        return result
+
+    def close(self, wait: bool = False):
+        self._threads.shutdown(wait=wait, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=True)
+
+
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> Orchestrator:
+    """Process-wide Orchestrator, configured from the environment on first use."""
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                _orchestrator = Orchestrator(
+                    prosody_workers=int(os.getenv("SPEAKEASY_PROSODY_WORKERS", "2")),
+                    vlm_url=os.getenv("SPEAKEASY_VLM_URL") or None,
+                )
+    return _orchestrator
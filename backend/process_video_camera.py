@@ -2,61 +2,149 @@
 Script to capture video from camera and send frames to Modal VLM endpoint
 for analysis of speaker expressiveness and posture.
 """
+import asyncio
 import cv2
 import numpy as np
-import base64
 import json
-import urllib.request
-import ssl
 import os
 import time
-from io import BytesIO
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from uuid import uuid4
 from datetime import datetime
 
+from backend.frame_codec import FramePolicy, encode_jpeg, policy_for_question, post_frames_async
+from backend.http_clients import run_sync, submit
+from backend.keyframes import KeyframeSelector
+from backend.rating_schema import build_question
 
-def encode_frame(frame):
-    """Encode a frame (numpy array) to base64 string."""
-    # Convert BGR to RGB (OpenCV uses BGR, PIL uses RGB)
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    # Convert to PIL Image
-    pil_image = Image.fromarray(frame_rgb)
-    
-    # Convert to bytes
-    buffer = BytesIO()
-    pil_image.save(buffer, format="JPEG", quality=85)
-    image_bytes = buffer.getvalue()
-    
-    # Encode to base64
-    return base64.b64encode(image_bytes).decode("utf-8")
 
+def post_frames(url: str, header: dict, frames) -> dict:
+    """POST a packed frame body (see frame_codec) and return the decoded JSON response."""
+    return run_sync(post_frames_async(url, header, frames))
 
-def capture_and_analyze(
-    modal_url: str,
-    question: str = """You are an expert debate coach. Based on the user's video input, how would you evaluate their delivery in terms of the following:
 
-- Posture: Are they standing confidently, or do they lean, slouch, or shift excessively?
-- Hand Gestures: Are their gestures natural and supportive, or distracting, repetitive, or minimal?
-- Eye Contact: Do they consistently engage with the audience/camera, or look away too often?
-- Vocal Intensity: Does their tone convey confidence and clarity, or is it monotone, overly aggressive, or lacking projection?
-- Facial Expression: Are their expressions appropriate, expressive, or inconsistent with their message?
-- Overall Presence: Do they appear confident, persuasive, and engaged?
+class ChunkedUploader:
+    """
+    Encode frames on a thread pool and upload them in chunks while capture is still running.
+
+    Frames are JPEG-encoded straight from the BGR buffer under `policy` and sent
+    as packed binary bodies (see frame_codec), not base64 inside JSON.
+
+    Each chunk is a self-contained POST with `session_id`, `chunk_index`, `final`
+    and its frames, so the endpoint can analyze it immediately. The endpoint keeps
+    no session state: the final POST carries the per-frame results of every earlier
+    chunk in `previous_results`, and the endpoint builds the combined analysis from
+    those plus its own frames. Once capture stops, only the last chunk is left to
+    encode and send.
+
+    Uploads run on the shared I/O loop (see http_clients): they reuse keep-alive
+    connections, are retried on transient failures, and at most the "modal"
+    service's concurrency limit are in flight at once.
+
+    Args:
+        modal_url: URL of the Modal endpoint (from analyze_video)
+        question: Question to ask about the video frames
+        chunk_size: Frames per chunk
+        encode_workers: Threads encoding frames
+        policy: Downscale/quality policy (default: chosen from the question)
+        structured: Ask the endpoint for constrained rating_schema output instead of free text
+    """
+
+    def __init__(
+        self,
+        modal_url: str,
+        question: str,
+        chunk_size: int = 8,
+        encode_workers: int = 4,
+        policy: Optional[FramePolicy] = None,
+        structured: bool = False,
+    ):
+        self.modal_url = modal_url
+        self.question = question
+        self.structured = structured
+        self.policy = policy or policy_for_question(question)
+        self.chunk_size = chunk_size
+        self.session_id = uuid4().hex
+        self.frames_added = 0
+        self.failed_chunks = []
+        self._encoder = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix="frame-encode")
+        self._pending = []  # encode futures for the chunk being filled
+        self._chunks = []  # upload futures, in chunk order
 
-After assessing each category, what 2–3 concrete suggestions would you give to help them improve?""",
+    def add_frame(self, frame: np.ndarray):
+        """Queue a frame for encoding; sends a chunk once `chunk_size` frames are queued."""
+        self._pending.append(self._encoder.submit(encode_jpeg, frame, self.policy))
+        self.frames_added += 1
+        if len(self._pending) >= self.chunk_size:
+            chunk_index = len(self._chunks)
+            self._chunks.append(submit(self._send_chunk(chunk_index, self._pending)))
+            self._pending = []
+
+    async def _send_chunk(self, chunk_index: int, encoded, final: bool = False, previous_results=None) -> dict:
+        header = {
+            "session_id": self.session_id,
+            "chunk_index": chunk_index,
+            "final": final,
+            "question": self.question,
+            "structured": self.structured,
+        }
+        if final:
+            header["previous_results"] = previous_results or []
+        frames = [await asyncio.wrap_future(future) for future in encoded]
+        return await post_frames_async(self.modal_url, header, frames)
+
+    def finish(self) -> dict:
+        """Send the last chunk with the earlier chunks' results and return the final response."""
+        previous_results = []
+        for chunk_index, future in enumerate(self._chunks):
+            try:
+                previous_results.extend(future.result().get("results", []))
+            except Exception as e:
+                print(f"\nChunk {chunk_index} failed: {e}")
+                self.failed_chunks.append(chunk_index)
+        try:
+            return run_sync(self._send_chunk(len(self._chunks), self._pending, final=True, previous_results=previous_results))
+        finally:
+            self._pending = []
+            self.close()
+
+    @property
+    def chunks_sent(self) -> int:
+        return len(self._chunks) + 1
+
+    def close(self):
+        self._encoder.shutdown(wait=False, cancel_futures=True)
+        for future in self._chunks:
+            future.cancel()
+
+
+def capture_and_analyze(
+    modal_url: str,
+    question: Optional[str] = None,
     duration_seconds: float = 15.0,
     fps_limit: int = 30,
     output_file: str = None,
+    keyframe_method: str = "diff",
+    max_frames: int = 30,
+    chunk_size: int = 8,
+    frame_policy: Optional[FramePolicy] = None,
 ):
     """
     Capture video frames from camera and send to Modal for analysis.
     
     Args:
         modal_url: URL of the Modal endpoint (from analyze_video)
-        question: Question to ask about the video frames
+        question: Question to ask about the video frames (default: rate each frame against
+            rating_schema, decoded by the endpoint as constrained choices)
         duration_seconds: Duration to capture video (in seconds)
-        fps_limit: Capture every Nth frame (30 = one frame per second at 30fps, reduces token usage)
+        fps_limit: Capture every Nth frame (30 = one frame per second at 30fps); only used when keyframe_method is None
         output_file: Path to save JSON output (default: analysis_TIMESTAMP.json)
+        keyframe_method: Keep frames that changed since the last kept one ("diff", "hist" or "dhash"),
+            or None for fixed every-Nth-frame sampling
+        max_frames: Frame budget for the session (caps VLM image tokens)
+        chunk_size: Frames per upload; chunks are encoded and sent while recording continues
+        frame_policy: Downscale/quality policy for uploaded frames (default: chosen from the question)
     """
     print("Initializing camera...")
     cap = cv2.VideoCapture(0)
@@ -74,7 +162,10 @@ After assessing each category, what 2–3 concrete suggestions would you give to
     if fps <= 0:
         fps = 30.0  # Default to 30 FPS if camera doesn't report it
     
-    frames = []
+    structured = question is None
+    if structured:
+        question = build_question()
+    uploader = ChunkedUploader(modal_url, question, chunk_size=chunk_size, policy=frame_policy, structured=structured)
     frame_count = 0
     captured_count = 0
     
@@ -82,9 +173,20 @@ After assessing each category, what 2–3 concrete suggestions would you give to
     start_time = time.time()
     end_time = start_time + duration_seconds
     
+    selector = None
+    if keyframe_method:
+        selector = KeyframeSelector(
+            method=keyframe_method,
+            max_frames=max_frames,
+            expected_duration_sec=duration_seconds,
+        )
+    
     print(f"\nRecording for {duration_seconds} seconds... Press 'q' to stop early.")
-    print(f"Capturing every {fps_limit} frame(s) at ~{fps:.1f} FPS (approximately 1 frame per second)")
-    print(f"Expected frames: ~{int(duration_seconds * fps / fps_limit)}")
+    if selector:
+        print(f"Keeping frames that change ({keyframe_method}) at ~{fps:.1f} FPS, budget {max_frames} frames")
+    else:
+        print(f"Capturing every {fps_limit} frame(s) at ~{fps:.1f} FPS (approximately 1 frame per second)")
+        print(f"Expected frames: ~{int(duration_seconds * fps / fps_limit)}")
     
     while cap.isOpened():
         current_time = time.time()
@@ -102,9 +204,10 @@ After assessing each category, what 2–3 concrete suggestions would you give to
             print("Failed to grab frame")
             break
         
-        # Only capture every Nth frame
-        if frame_count % fps_limit == 0:
-            frames.append(frame)
+        # Keep frames that differ enough from the last kept one (or every Nth frame without a selector)
+        keep = selector.offer(frame, elapsed_time) if selector else frame_count % fps_limit == 0
+        if keep:
+            uploader.add_frame(frame)
             captured_count += 1
             # Update display with time remaining
             print(f"Recording... {elapsed_time:.1f}s / {duration_seconds:.1f}s | Frames: {captured_count} | Remaining: {remaining_time:.1f}s", end="\r")
@@ -128,108 +231,85 @@ After assessing each category, what 2–3 concrete suggestions would you give to
     cap.release()
     cv2.destroyAllWindows()
     
-    if not frames:
+    if not captured_count:
+        uploader.close()
         print("No frames captured")
         return
     
     actual_duration = time.time() - start_time
-    print(f"\nCaptured {len(frames)} frames in {actual_duration:.1f} seconds. Encoding and sending to Modal...")
-    
-    # Encode frames to base64
-    encoded_frames = []
-    for i, frame in enumerate(frames):
-        encoded_frame = encode_frame(frame)
-        encoded_frames.append(encoded_frame)
-        if (i + 1) % 5 == 0:
-            print(f"Encoded {i + 1}/{len(frames)} frames", end="\r")
-    
-    print(f"\nSending {len(encoded_frames)} frames to Modal endpoint...")
+    print(f"\nCaptured {captured_count} frames in {actual_duration:.1f} seconds. Sending the last chunk to Modal...")
+    if selector:
+        print(f"Kept {selector.kept} of {selector.offered} camera frames")
     
-    # Prepare payload
-    payload = json.dumps(
-        {
-            "frames": encoded_frames,
+    try:
+        stopped_at = time.time()
+        result = uploader.finish()
+        print(f"Result ready {time.time() - stopped_at:.1f}s after capture stopped ({uploader.chunks_sent} chunks)")
+        
+        # Add metadata to result
+        result["metadata"] = {
+            "timestamp": datetime.now().isoformat(),
+            "duration_seconds": actual_duration,
+            "frames_captured": captured_count,
+            "session_id": uploader.session_id,
+            "chunks_sent": uploader.chunks_sent,
+            "failed_chunks": uploader.failed_chunks,
             "question": question,
+            "modal_url": modal_url
         }
-    )
-    
-    # Send to Modal
-    req = urllib.request.Request(
-        modal_url,
-        data=payload.encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    
-    try:
-        # Create SSL context for HTTPS requests (fixes SSL certificate verification errors)
-        ssl_context = ssl._create_unverified_context()
         
-        with urllib.request.urlopen(req, context=ssl_context) as response:
-            assert response.getcode() == 200, f"HTTP {response.getcode()}"
-            result = json.loads(response.read().decode())
-            
-            # Add metadata to result
-            result["metadata"] = {
-                "timestamp": datetime.now().isoformat(),
-                "duration_seconds": actual_duration,
-                "frames_captured": len(frames),
-                "question": question,
-                "modal_url": modal_url
-            }
-            
-            print("\n" + "=" * 80)
-            print("VIDEO ANALYSIS RESULTS")
-            print("=" * 80)
-            print(f"\nRequest ID: {result.get('request_id')}")
-            print(f"Total frames captured: {result.get('total_frames')}")
-            print(f"Frames analyzed: {result.get('frames_processed', result.get('frames_observed', 'N/A'))}")
-            if result.get('sample_rate'):
-                print(f"Sample rate: {result.get('sample_rate')}")
-            print("\n" + "-" * 80)
-            print("OVERALL ASSESSMENT:")
-            print("-" * 80)
-            
-            # Get overall analysis from results
-            overall_analysis = None
-            if "results" in result and len(result["results"]) > 0:
-                # Check for overall_analysis in results
-                for res in result["results"]:
-                    if "overall_analysis" in res:
-                        overall_analysis = res["overall_analysis"]
-                        break
-            
-            # Fallback to combined_analysis if available
-            if not overall_analysis:
-                overall_analysis = result.get("combined_analysis", "No analysis available")
-            
-            print(overall_analysis)
-            print("\n" + "=" * 80)
-            
-            # Generate output filename if not provided
-            if output_file is None:
-                # Get the directory where this script is located (backend folder)
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                # Go up one level to the parent directory
-                parent_dir = os.path.dirname(script_dir)
-                # Create info_json_output folder path
-                output_dir = os.path.join(parent_dir, "info_json_output")
-                
-                # Create the directory if it doesn't exist
-                os.makedirs(output_dir, exist_ok=True)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = os.path.join(output_dir, f"analysis_{timestamp}.json")
-            
-            # Write result to JSON file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            
-            print(f"\nResults saved to: {output_file}")
-            print("=" * 80)
+        print("\n" + "=" * 80)
+        print("VIDEO ANALYSIS RESULTS")
+        print("=" * 80)
+        print(f"\nRequest ID: {result.get('request_id')}")
+        print(f"Total frames captured: {result.get('total_frames')}")
+        print(f"Frames analyzed: {result.get('frames_processed', result.get('frames_observed', 'N/A'))}")
+        if result.get('sample_rate'):
+            print(f"Sample rate: {result.get('sample_rate')}")
+        print("\n" + "-" * 80)
+        print("OVERALL ASSESSMENT:")
+        print("-" * 80)
+        
+        # Get overall analysis from results
+        overall_analysis = None
+        if "results" in result and len(result["results"]) > 0:
+            # Check for overall_analysis in results
+            for res in result["results"]:
+                if "overall_analysis" in res:
+                    overall_analysis = res["overall_analysis"]
+                    break
+        
+        # Fallback to combined_analysis if available
+        if not overall_analysis:
+            overall_analysis = result.get("combined_analysis", "No analysis available")
+        
+        print(overall_analysis)
+        print("\n" + "=" * 80)
+        
+        # Generate output filename if not provided
+        if output_file is None:
+            # Get the directory where this script is located (backend folder)
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            # Go up one level to the parent directory
+            parent_dir = os.path.dirname(script_dir)
+            # Create info_json_output folder path
+            output_dir = os.path.join(parent_dir, "info_json_output")
             
-            return result
+            # Create the directory if it doesn't exist
+            os.makedirs(output_dir, exist_ok=True)
             
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = os.path.join(output_dir, f"analysis_{timestamp}.json")
+        
+        # Write result to JSON file
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        
+        print(f"\nResults saved to: {output_file}")
+        print("=" * 80)
+        
+        return result
+        
     except Exception as e:
         print(f"\nError sending request to Modal: {str(e)}")
         import traceback
@@ -250,7 +330,7 @@ if __name__ == "__main__":
         print(f"DEBUG: Using Modal URL: '{modal_url}'")
         print(f"DEBUG: URL length: {len(modal_url)}")
     else:
-        print("Usage: python process_video_camera.py <modal_endpoint_url> [output_file.json]")
+        print("Usage: python -m backend.process_video_camera <modal_endpoint_url> [output_file.json]")
         print("\nTo get the endpoint URL:")
         print("1. Deploy the Modal app: modal deploy backend/sgl_vlm.py")
         print("2. Get the URL from Modal dashboard or use: modal app show example-sgl-vlm")
@@ -266,37 +346,4 @@ if __name__ == "__main__":
     # Get optional output file from command line
     output_file = sys.argv[2] if len(sys.argv) > 2 else None
     
-    question = """
-You are an expert debate coach in ENGLISH (output in ENGLISH). Based on the user's video input, can you evaluate their delivery for each frame using the following categories, giving a rating of "high", "medium", or "low" for each?
-
-- Posture: Are they standing confidently, balanced, and upright, or do they lean, slouch, sway, or shift excessively?
-- Hand Gestures: Are gestures natural, supportive, and purposeful, or are they distracting, repetitive, rigid, or minimal?
-- Eye Contact: Do they maintain consistent engagement with the audience/camera, or do they look away too often, down, or off-screen?
-- Vocal Intensity: Is their vocal delivery confident, clear, well-projected, and dynamic, or is it monotone, overly aggressive, or lacking presence?
-- Facial Expression: Are their expressions expressive and aligned with their message, or are they flat, tense, or inconsistent?
-- Overall Presence: Do they appear persuasive, confident, focused, and engaged?
-
-Additionally, can you evaluate the speaker in terms of:
-- Intensity (energy and emotional impact)
-- Confidence (steadiness, comfort, assertiveness)
-- Presence (audience engagement and ability to command attention)
-
-Please output ONLY a JSON object in this exact structure:
-
-{
-  "Posture": "",
-  "Hand Gestures": "",
-  "Eye Contact": "",
-  "Vocal Intensity": "",
-  "Facial Expression": "",
-  "Overall Presence": "",
-  "Intensity": "",
-  "Confidence": "",
-  "Presence": ""
-}
-
-Each field should contain the rating "high", "medium", or "low" for that frame.
-
-After evaluating all frames, can you also give 2–3 specific and actionable suggestions to help improve their delivery, keeping the suggestions practical, short, and realistic?"""
-    
-    capture_and_analyze(modal_url, question=question, output_file=output_file)
\ No newline at end of file
+    capture_and_analyze(modal_url, output_file=output_file)
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Per-frame delivery rating schema shared by the camera client and the VLM endpoint.
+
+The client builds its question from these fields, and the endpoint constrains
+decoding to `ratings_regex()` within `ratings_max_tokens()`, so the model can
+neither write a preamble nor be cut off before the object closes.
+"""
+import json
+
+RATING_LEVELS = ("high", "medium", "low")
+
+# (JSON key, what the rater should look for)
+RATING_FIELDS = (
+    ("Posture", "Are they standing confidently, balanced, and upright, or do they lean, slouch, sway, or shift excessively?"),
+    ("Hand Gestures", "Are gestures natural, supportive, and purposeful, or are they distracting, repetitive, rigid, or minimal?"),
+    ("Eye Contact", "Do they maintain consistent engagement with the audience/camera, or do they look away too often, down, or off-screen?"),
+    ("Vocal Intensity", "Is their vocal delivery confident, clear, well-projected, and dynamic, or is it monotone, overly aggressive, or lacking presence?"),
+    ("Facial Expression", "Are their expressions expressive and aligned with their message, or are they flat, tense, or inconsistent?"),
+    ("Overall Presence", "Do they appear persuasive, confident, focused, and engaged?"),
+    ("Intensity", "Energy and emotional impact."),
+    ("Confidence", "Steadiness, comfort, assertiveness."),
+    ("Presence", "Audience engagement and ability to command attention."),
+)
+FIELD_NAMES = tuple(name for name, _ in RATING_FIELDS)
+
+
+def ratings_regex() -> str:
+    """Regex matching exactly the compact ratings object, e.g. {"Posture": "high", ...}."""
+    levels = "|".join(RATING_LEVELS)
+    fields = ", ".join(f'"{name}": "({levels})"' for name in FIELD_NAMES)  # names are plain words
+    return r"\{" + fields + r"\}"
+
+
+def ratings_max_tokens(headroom: int = 16) -> int:
+    """
+    Generation budget for one ratings object. Every token is at least one character,
+    so the length of the longest valid object bounds its token count.
+    """
+    longest = max(RATING_LEVELS, key=len)
+    return len(json.dumps({name: longest for name in FIELD_NAMES})) + headroom
+
+
+def build_question() -> str:
+    """The per-frame rating prompt sent by the camera client."""
+    criteria = "\n".join(f"- {name}: {description}" for name, description in RATING_FIELDS)
+    template = json.dumps({name: "" for name in FIELD_NAMES}, indent=2)
+    levels = ", ".join(f'"{level}"' for level in RATING_LEVELS[:-1]) + f', or "{RATING_LEVELS[-1]}"'
+    return f"""
+You are an expert debate coach in ENGLISH (output in ENGLISH). Based on the user's video input, evaluate their delivery in this frame using the following categories, giving a rating of {levels} for each:
+
+{criteria}
+
+Please output ONLY a JSON object in this exact structure:
+
+{template}
+
+Each field should contain the rating {levels} for that frame."""
+
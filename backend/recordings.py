@@ -0,0 +1,128 @@
+"""
+Indexed store for saved recordings.
+
+Recording ids come from a SQLite AUTOINCREMENT counter, so allocating one
+is a single insert no matter how many recordings exist, and two concurrent
+uploads can never get the same number. Each row also holds the metadata
+(duration, sample rate, transcript id, analysis results) that listings and
+lookups need, so nothing has to scan the audio directory.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+FILENAME_TEMPLATE = "user_recording_#{id}.wav"
+FILENAME_PATTERN = re.compile(r"user_recording_#(\d+)\.wav$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    duration_sec REAL,
+    sample_rate INTEGER,
+    transcript_id TEXT,
+    transcript TEXT,
+    feedback TEXT,
+    analysis TEXT,
+    job_id TEXT
+)
+"""
+JSON_COLUMNS = ("analysis",)
+UPDATABLE_COLUMNS = ("duration_sec", "sample_rate", "transcript_id", "transcript", "feedback", "analysis", "job_id")
+
+
+class RecordingStore:
+    """
+    SQLite-backed index of the recordings saved in `audio_dir`.
+
+    Args:
+        db_path: SQLite database file
+        audio_dir: Directory the WAV files live in; scanned once to seed a new database
+    """
+
+    def __init__(self, db_path: str, audio_dir: str):
+        self.db_path = db_path
+        self.audio_dir = audio_dir
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            created = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='recordings'"
+            ).fetchone() is None
+            conn.execute(SCHEMA)
+        if created:
+            self._import_existing_files()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite serializes the writers
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _import_existing_files(self):
+        """One-time migration: register recordings saved before the store existed."""
+        rows = []
+        for name in os.listdir(self.audio_dir):
+            match = FILENAME_PATTERN.match(name)
+            if match:
+                rows.append((int(match.group(1)), name, os.path.getmtime(os.path.join(self.audio_dir, name))))
+        if rows:
+            with self._conn() as conn:
+                conn.executemany("INSERT OR IGNORE INTO recordings (id, filename, created_at) VALUES (?, ?, ?)", rows)
+
+    def allocate(self) -> dict:
+        """Reserve the next recording id and filename."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("INSERT INTO recordings (created_at) VALUES (?)", (time.time(),))
+            recording_id = cursor.lastrowid
+            filename = FILENAME_TEMPLATE.format(id=recording_id)
+            conn.execute("UPDATE recordings SET filename = ? WHERE id = ?", (filename, recording_id))
+        return {"id": recording_id, "filename": filename, "filepath": os.path.join(self.audio_dir, filename)}
+
+    def update(self, recording_id: int, **fields):
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown recording fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        values = [json.dumps(v) if k in JSON_COLUMNS and v is not None else v for k, v in fields.items()]
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE recordings SET {assignments} WHERE id = ?", values + [recording_id])
+
+    def delete(self, recording_id: int):
+        """Drop a recording's row and its audio file, e.g. when its upload was turned away."""
+        record = self.get(recording_id)
+        with self._conn() as conn:
+            conn.execute("DELETE FROM recordings WHERE id = ?", (recording_id,))
+        if record is not None and os.path.exists(record["filepath"]):
+            os.remove(record["filepath"])
+
+    def _to_dict(self, row: sqlite3.Row) -> dict:
+        record = dict(row)
+        for column in JSON_COLUMNS:
+            if record.get(column) is not None:
+                record[column] = json.loads(record[column])
+        record["filepath"] = os.path.join(self.audio_dir, record["filename"])
+        return record
+
+    def get(self, recording_id: int) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM recordings WHERE id = ?", (recording_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit: int = 50, offset: int = 0) -> list:
+        """Most recent recordings first."""
+        rows = self._conn().execute(
+            "SELECT * FROM recordings ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
@@ -0,0 +1,106 @@
+"""
+Production entry point for the API: gunicorn with threaded workers.
+
+`python -m backend.api` is the Werkzeug development server, with a single
+process, the reloader and no limits. This module runs the same app under
+gunicorn's gthread worker and is also a gunicorn config file:
+
+    python -m backend.serve
+    gunicorn -c backend/serve.py backend.api:app
+
+Settings come from the environment:
+
+    SPEAKEASY_BIND=0.0.0.0:5000
+    SPEAKEASY_WORKERS=1           worker processes (see below)
+    SPEAKEASY_THREADS=32          request threads per worker
+    SPEAKEASY_BACKLOG=128         connections the kernel queues while every thread is busy
+    SPEAKEASY_TIMEOUT=120         seconds before a stuck worker is restarted
+
+The API applies these limits itself (see backend.api):
+
+    SPEAKEASY_MAX_UPLOAD_MB=64            413 for larger request bodies
+    SPEAKEASY_MAX_CONCURRENT_UPLOADS=8    429 while that many upload bodies are being received
+    SPEAKEASY_MAX_PENDING_JOBS=32         503 + Retry-After once that many analyses are queued or running
+
+Jobs, their event streams and the prosody process pool belong to the worker
+process that accepted the upload. A client polling /api/jobs/<id> on another
+worker gets 404, so keep one worker and scale with threads. The CPU-heavy
+prosody work already runs in its own processes, and everything else waits
+on I/O. More than one worker needs sticky routing by job id in front.
+
+Each request thread holds one connection for as long as the response lasts,
+including SSE job streams and `?wait=1` uploads. Size SPEAKEASY_THREADS for
+the concurrent listeners you expect plus some headroom.
+
+RUN COMMAND: python -m backend.serve
+"""
+import os
+import sys
+
+_bind = os.getenv("SPEAKEASY_BIND", "0.0.0.0:5000")
+
+# gunicorn settings (read from this module by `gunicorn -c backend/serve.py`)
+bind = [_bind]
+workers = int(os.getenv("SPEAKEASY_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("SPEAKEASY_THREADS", "32"))
+backlog = int(os.getenv("SPEAKEASY_BACKLOG", "128"))
+timeout = int(os.getenv("SPEAKEASY_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+# The app must load in each worker: its SQLite connections, job threads and process pools cannot cross a fork
+preload_app = False
+accesslog = "-"
+
+
+def when_ready(server):
+    if workers > 1:
+        server.log.warning(
+            "SPEAKEASY_WORKERS=%d: jobs live in the worker that accepted the upload; "
+            "route /api/jobs/<id> back to it or clients will get 404", workers
+        )
+    server.log.info("Serving backend.api on %s with %d worker(s) x %d threads", _bind, workers, threads)
+
+
+def post_worker_init(worker):
+    # The listening socket is already open, so background warm-up starts at once and never delays serving
+    from backend.startup import start_warmup
+
+    host, _, port = _bind.rpartition(":")
+    start_warmup(host if host not in ("", "0.0.0.0", "[::]") else "127.0.0.1", int(port))
+
+
+def worker_exit(server, worker):
+    from backend.orchestrator import _orchestrator
+
+    if _orchestrator is not None:
+        _orchestrator.close()
+
+
+def main():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("gunicorn is not installed: pip install -r backend/requirements.txt")
+
+    settings = {
+        name: value for name, value in globals().items()
+        if name in ("bind", "workers", "worker_class", "threads", "backlog", "timeout", "graceful_timeout",
+                    "keepalive", "preload_app", "accesslog", "when_ready", "post_worker_init", "worker_exit")
+    }
+
+    class SpeakEasyApplication(BaseApplication):
+        def load_config(self):
+            for name, value in settings.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            from backend.api import app
+
+            return app
+
+    SpeakEasyApplication().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
+import base64
+import json
 import os
+import re
 import time
+from collections import Counter, OrderedDict
 import warnings
 from pathlib import Path
 from typing import Optional
@@ -13,6 +17,11 @@ GPU_COUNT = os.environ.get("GPU_COUNT", 1)
 GPU_CONFIG = f"{GPU_TYPE}:{GPU_COUNT}"
 
 SGL_LOG_LEVEL = "error"  # try "debug" or "info" if you have issues
+# Draw each generate() image in the container log with term-image (slow; for debugging only)
+RENDER_IMAGES = os.environ.get("SGL_VLM_RENDER_IMAGES", "0") == "1"
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("SGL_VLM_IMAGE_CACHE_MB", "64")) * 1024 * 1024
+IMAGE_FETCH_TIMEOUT_SEC = 10
+DEFAULT_IMAGE_URL = "https://modal-public-assets.s3.amazonaws.com/golden-gate-bridge.jpg"
 
 MINUTES = 60  # seconds
 
@@ -71,8 +80,144 @@ vlm_image = (
     .pip_install(  # add an optional extra that renders images in the terminal
         "term-image==0.7.1"
     )
+    .add_local_python_source("backend")  # frame_codec for binary frame uploads
 )
 
+with vlm_image.imports():
+    import fastapi
+
+
+def decode_frame_request(body: bytes, content_type: str = ""):
+    """
+    Read the header fields and JPEG frames from an analyze request.
+
+    Packed binary bodies (backend.frame_codec) are split in place; legacy JSON
+    bodies with base64 `frames` are still accepted.
+
+    Returns:
+        (header dict, list of JPEG frames as bytes-like objects)
+    """
+    from backend.frame_codec import CONTENT_TYPE, unpack_frames
+
+    if content_type.split(";")[0].strip() == CONTENT_TYPE:
+        return unpack_frames(body)
+    payload = json.loads(body)
+    frames = [base64.b64decode(frame) for frame in payload.pop("frames", [])]
+    return payload, frames
+
+
+class ImageCache:
+    """
+    Bounded in-memory LRU of fetched images, keyed by URL.
+
+    Concurrent requests for the same URL share one download. Only touched from
+    the endpoint's event loop, so it needs no lock.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._inflight = {}
+
+    async def fetch(self, client, url: str) -> bytes:
+        import asyncio
+
+        if url in self._images:
+            self.hits += 1
+            self._images.move_to_end(url)
+            return self._images[url]
+        if url in self._inflight:
+            self.hits += 1
+            return await asyncio.shield(self._inflight[url])
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._download(client, url))
+        self._inflight[url] = task
+        try:
+            data = await asyncio.shield(task)
+        finally:
+            self._inflight.pop(url, None)
+        self._store(url, data)
+        return data
+
+    @staticmethod
+    async def _download(client, url: str) -> bytes:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.content
+
+    def _store(self, url: str, data: bytes):
+        if len(data) > self.max_bytes or url in self._images:
+            return
+        self._images[url] = data
+        self.total_bytes += len(data)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+
+RATING_SCORES = {"low": 1, "medium": 2, "high": 3}
+FRAME_MAX_NEW_TOKENS = 256
+# The rubric (the client's question) is sent as the system message, ahead of the image, so every
+# frame and every request shares the same token prefix and the radix cache only prefills image tokens
+FRAME_INSTRUCTION = "Rate the speaker in this frame."
+COMBINED_MAX_NEW_TOKENS = 384
+COMBINED_PROMPT = """You are an expert debate coach. A speaker's delivery was rated frame by frame ("low", "medium" or "high" per category). Here is the summary across {frames} frames, with the mean score (low=1, medium=2, high=3) and the most common rating for each category:
+
+{summary}
+
+Write a short overall assessment of their delivery, then give 2-3 specific, practical suggestions to improve it."""
+
+
+def parse_ratings(answer: str) -> Optional[dict]:
+    """Pull the JSON ratings object out of a model answer; None if it has none."""
+    match = re.search(r"\{.*\}", answer, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    ratings = {key: str(value).strip().lower() for key, value in data.items()}
+    return {key: value for key, value in ratings.items() if value in RATING_SCORES} or None
+
+
+def prefix_cache_usage(states, names) -> dict:
+    """Prompt vs. radix-cache-hit tokens over the named gen calls of finished states."""
+    prompt_tokens = cached_tokens = 0
+    for state in states:
+        for name in names:
+            meta = state.get_meta_info(name) or {}
+            prompt_tokens += meta.get("prompt_tokens", 0)
+            cached_tokens += meta.get("cached_tokens", 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "hit_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None,
+    }
+
+
+def summarize_ratings(results: list) -> dict:
+    """Per category: mean score and most common rating over every frame that has ratings."""
+    per_category = {}
+    for result in results:
+        for category, rating in (result.get("ratings") or {}).items():
+            per_category.setdefault(category, []).append(rating)
+    return {
+        category: {
+            "mean_score": round(sum(RATING_SCORES[r] for r in ratings) / len(ratings), 2),
+            "most_common": Counter(ratings).most_common(1)[0][0],
+            "frames": len(ratings),
+        }
+        for category, ratings in per_category.items()
+    }
+
+
 app = modal.App("example-sgl-vlm")
 
 
@@ -100,54 +245,190 @@ class Model:
             MODEL_CHAT_TEMPLATE
         )
         sgl.set_default_backend(self.runtime)
+        self.warm_rubric_prefix()
+
+    def warm_rubric_prefix(self):
+        """Prefill the default rubric once so the first analyze request already hits the radix cache."""
+        import sglang as sgl
+
+        from backend.rating_schema import build_question
+
+        @sgl.function
+        def prime(s, rubric):
+            s += sgl.system(rubric)
+            s += sgl.user(FRAME_INSTRUCTION)
+            s += sgl.assistant(sgl.gen("ack", max_tokens=1))
+
+        prime.run(rubric=build_question())
+
+    @modal.enter()
+    def start_http_client(self):
+        """Pooled async HTTP client and image LRU shared by every generate() call."""
+        import httpx  # installed with fastapi[standard]
+
+        self.http = httpx.AsyncClient(
+            timeout=IMAGE_FETCH_TIMEOUT_SEC,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            follow_redirects=True,
+        )
+        self.image_cache = ImageCache()
+
+    async def _read_image(self, request: "fastapi.Request"):
+        """Image bytes and question from a raw image body or a JSON body with `image_base64` or `image_url`."""
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("image/"):
+            return await request.body(), request.query_params.get("question")
+        payload = await request.json()
+        if payload.get("image_base64"):
+            return base64.b64decode(payload["image_base64"]), payload.get("question")
+        image_url = payload.get("image_url") or DEFAULT_IMAGE_URL
+        return await self.image_cache.fetch(self.http, image_url), payload.get("question")
 
     @modal.fastapi_endpoint(method="POST", docs=True)
-    def generate(self, request: dict) -> str:
-        from pathlib import Path
+    async def generate(self, request: "fastapi.Request") -> str:
+        """
+        Answer a question about one image.
+
+        The image can be posted inline (an `image/*` body with `?question=`, or
+        JSON `image_base64`) or referenced by JSON `image_url`, fetched through
+        a pooled async client and kept in a small LRU. Bytes go straight to the
+        runtime; nothing is written to disk.
+        """
+        import asyncio
 
-        import requests
         import sglang as sgl
-        from term_image.image import from_file
 
         start = time.monotonic_ns()
         request_id = uuid4()
         print(f"Generating response to request {request_id}")
 
-        image_url = request.get("image_url")
-        if image_url is None:
-            image_url = (
-                "https://modal-public-assets.s3.amazonaws.com/golden-gate-bridge.jpg"
-            )
-
-        response = requests.get(image_url)
-        response.raise_for_status()
-
-        image_filename = image_url.split("/")[-1]
-        image_path = Path(f"/tmp/{uuid4()}-{image_filename}")
-        image_path.write_bytes(response.content)
+        image, question = await self._read_image(request)
+        if question is None:
+            question = "What is this?"
 
         @sgl.function
-        def image_qa(s, image_path, question):
-            s += sgl.user(sgl.image(str(image_path)) + question)
+        def image_qa(s, image, question):
+            s += sgl.user(sgl.image(image) + question)
             s += sgl.assistant(sgl.gen("answer"))
 
-        question = request.get("question")
-        if question is None:
-            question = "What is this?"
+        # run() blocks until generation finishes; keep the event loop free for other requests
+        state = await asyncio.to_thread(image_qa.run, image=image, question=question, max_new_tokens=128)
 
-        state = image_qa.run(
-            image_path=image_path, question=question, max_new_tokens=128
-        )
-        # show the question and image in the terminal for demonstration purposes
-        print(Colors.BOLD, Colors.GRAY, "Question: ", question, Colors.END, sep="")
-        terminal_image = from_file(image_path)
-        terminal_image.draw()
+        if RENDER_IMAGES:
+            # show the question and image in the terminal for demonstration purposes
+            from io import BytesIO
+
+            from PIL import Image
+            from term_image.image import AutoImage
+
+            print(f"Question: {question}")
+            AutoImage(Image.open(BytesIO(image))).draw()
         print(
             f"request {request_id} completed in {round((time.monotonic_ns() - start) / 1e9, 2)} seconds"
         )
 
         return state["answer"]
 
+    @modal.fastapi_endpoint(method="POST", docs=True)
+    async def analyze_video(self, request: "fastapi.Request") -> dict:
+        """
+        Rate every frame of a video chunk in one batched pass, then summarize.
+
+        Takes a packed frame body (backend.frame_codec) or JSON with base64
+        `frames`, plus the header fields `question`, `session_id`, `chunk_index`,
+        `final` and, on the final chunk, `previous_results` from earlier chunks.
+        Requests without chunk fields are treated as a single final chunk.
+
+        With `structured: true` each frame is rated against backend.rating_schema
+        by regex-constrained decoding: one level per field, no free text to parse.
+
+        The question is the system message, ahead of each image, so all frames share
+        one cached prefix; `prefix_cache` reports the radix cache hit ratio.
+        """
+        import asyncio
+
+        header, frames = decode_frame_request(await request.body(), request.headers.get("content-type", ""))
+        # run_batch blocks until the batch is done; keep the event loop free for other uploads
+        return await asyncio.to_thread(self._analyze_frames, header, frames)
+
+    def _analyze_frames(self, header: dict, frames: list) -> dict:
+        import sglang as sgl
+
+        from backend.rating_schema import build_question, ratings_max_tokens, ratings_regex
+
+        start = time.monotonic_ns()
+        request_id = uuid4()
+        structured = header.get("structured", False)
+        question = header.get("question") or build_question()
+        chunk_index = header.get("chunk_index", 0)
+        final = header.get("final", True)
+        print(f"Analyzing {len(frames)} frames for request {request_id} (chunk {chunk_index}, final={final})")
+
+        @sgl.function
+        def image_qa(s, image, rubric):
+            s += sgl.system(rubric)
+            s += sgl.user(sgl.image(image) + FRAME_INSTRUCTION)
+            s += sgl.assistant(sgl.gen("answer", max_tokens=FRAME_MAX_NEW_TOKENS))
+
+        @sgl.function
+        def rate_frame(s, image, rubric):
+            # One regex-constrained gen per frame: the model can only emit the ratings object
+            s += sgl.system(rubric)
+            s += sgl.user(sgl.image(image) + FRAME_INSTRUCTION)
+            s += sgl.assistant(sgl.gen("ratings", regex=ratings_regex(), max_tokens=ratings_max_tokens()))
+
+        @sgl.function
+        def coach_summary(s, prompt):
+            s += sgl.user(prompt)
+            s += sgl.assistant(sgl.gen("analysis", max_tokens=COMBINED_MAX_NEW_TOKENS))
+
+        # All frames go to the runtime together, so they share GPU batches instead of queuing one by one
+        batch = [{"image": bytes(frame), "rubric": question} for frame in frames]
+        results = []
+        if structured:
+            states = rate_frame.run_batch(batch, progress_bar=False) if batch else []
+            for i, state in enumerate(states):
+                answer = state["ratings"]
+                try:
+                    ratings = json.loads(answer)
+                except json.JSONDecodeError:
+                    # Generation was cut off before the object closed; skip the frame, keep the batch
+                    print(f"Frame {i} of chunk {chunk_index} returned incomplete ratings: {answer!r}")
+                    ratings = None
+                results.append({"chunk_index": chunk_index, "frame": i, "ratings": ratings, "answer": answer})
+        else:
+            states = image_qa.run_batch(batch, progress_bar=False) if batch else []
+            for i, state in enumerate(states):
+                answer = state["answer"]
+                results.append({"chunk_index": chunk_index, "frame": i, "ratings": parse_ratings(answer), "answer": answer})
+        cache = prefix_cache_usage(states, ["ratings" if structured else "answer"])
+
+        response = {
+            "request_id": str(request_id),
+            "session_id": header.get("session_id"),
+            "chunk_index": chunk_index,
+            "total_frames": len(frames),
+            "frames_processed": sum(1 for r in results if r["ratings"]),
+            "results": results,
+            "prefix_cache": cache,
+        }
+        if final:
+            all_results = list(header.get("previous_results") or []) + results
+            summary = summarize_ratings(all_results)
+            response["total_frames"] = len(all_results)
+            response["frames_processed"] = sum(1 for r in all_results if r.get("ratings"))
+            response["rating_summary"] = summary
+            if summary:
+                prompt = COMBINED_PROMPT.format(frames=response["frames_processed"], summary=json.dumps(summary, indent=2))
+                response["combined_analysis"] = coach_summary.run(prompt=prompt)["analysis"]
+            else:
+                response["combined_analysis"] = "No frame could be rated."
+
+        elapsed = round((time.monotonic_ns() - start) / 1e9, 2)
+        response["elapsed_sec"] = elapsed
+        print(f"request {request_id} completed in {elapsed} seconds (prefix cache hit ratio {cache['hit_ratio']})")
+        return response
+
     @modal.exit()  # what should a container do before it shuts down?
     def shutdown_runtime(self):
         self.runtime.shutdown()
@@ -0,0 +1,203 @@
+"""
+Fast startup for the API: heavy modules load lazily, and a warm-up hook
+preloads them after the server is already accepting connections.
+
+Nothing slow is imported when `backend.api` loads: the OpenAI SDK, the
+transcription backend, parselmouth and librosa (in the prosody worker
+processes) and the TTS engine all load on first use. Warm-up pays those
+costs ahead of the first request, on a background thread:
+
+    SPEAKEASY_WARMUP=background  warm up after the port is listening (default)
+    SPEAKEASY_WARMUP=eager       warm up before serving
+    SPEAKEASY_WARMUP=off         everything loads on first use
+
+`warmup_report()` (served at /api/startup) shows each step's cold cost.
+
+Import-time report for cold start, plus the cold and warm cost of each
+warm-up step (what the first request pays without warm-up):
+
+RUN COMMAND: python -m backend.startup --top 20
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+
+def _warm_llm():
+    from backend.stt_llm_tts import get_llm_client
+
+    get_llm_client()
+
+
+def _warm_asr():
+    from backend.transcription import get_client
+
+    get_client().warm_up()
+
+
+def _warm_prosody():
+    from backend.orchestrator import get_orchestrator
+
+    get_orchestrator().warm_up()
+
+
+def _warm_tts():
+    from backend.tts import get_engine
+
+    get_engine()
+
+
+# Most valuable first: every upload needs the LLM, ASR and prosody; spoken feedback is optional
+WARMUP_STEPS = (
+    ("llm_client", _warm_llm),
+    ("asr", _warm_asr),
+    ("prosody_workers", _warm_prosody),
+    ("tts", _warm_tts),
+)
+
+_report = {"mode": None, "state": "idle", "started_at": None, "finished_at": None, "steps": {}}
+_lock = threading.Lock()
+
+
+def warm_up(steps=WARMUP_STEPS) -> dict:
+    """Run each warm-up step, recording its seconds or its error; a failed step never stops the others."""
+    with _lock:
+        _report.update(state="running", started_at=time.time())
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            _report["steps"][name] = {"sec": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+            _report["steps"][name] = {"sec": round(time.perf_counter() - start, 3), "error": str(e)}
+    with _lock:
+        _report.update(state="done", finished_at=time.time())
+    return warmup_report()
+
+
+def warmup_report() -> dict:
+    with _lock:
+        return {**_report, "steps": dict(_report["steps"])}
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0) -> bool:
+    """Poll until something accepts connections on host:port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def start_warmup(host: Optional[str] = None, port: Optional[int] = None, mode: Optional[str] = None):
+    """
+    Warm up according to `mode` (default: SPEAKEASY_WARMUP). In background mode,
+    the thread waits until host:port is listening first, so warm-up never delays startup.
+    """
+    mode = mode or os.getenv("SPEAKEASY_WARMUP", "background")
+    with _lock:
+        if _report["mode"] is not None:
+            return  # already started in this process
+        _report["mode"] = mode
+    if mode == "off":
+        return
+    if mode == "eager":
+        warm_up()
+        return
+
+    def run():
+        if port is not None:
+            wait_for_port(host or "127.0.0.1", port)
+        warm_up()
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+def import_profile(module: str = "backend.api"):
+    """
+    Import `module` in a fresh interpreter under -X importtime.
+
+    Returns (total_sec, rows) with rows of (cumulative_sec, self_sec, module name)
+    for every module that import pulled in, slowest first.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr.strip().splitlines()[-1]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.rstrip()))
+    total = next((cumulative for cumulative, _, name in rows if name.strip() == module), 0.0)
+    rows.sort(reverse=True)
+    return total, rows
+
+
+def _measure_steps() -> str:
+    """Child-process body for `--steps`: cold then warm time of each step, as 'name cold warm error' lines."""
+    lines = []
+    for name, step in WARMUP_STEPS:
+        times, error = [], ""
+        for _ in range(2):
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                error = str(e).splitlines()[0]
+            times.append(time.perf_counter() - start)
+        lines.append(f"{name}\t{times[0]:.3f}\t{times[1]:.3f}\t{error}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and warm-up cost report for the API")
+    parser.add_argument("--module", default="backend.api")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--steps", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.steps:
+        import backend.api  # measure the steps on top of a normal startup
+        from backend.orchestrator import get_orchestrator
+
+        print(_measure_steps())
+        get_orchestrator().close(wait=True)  # the worker processes share our stdout; let them exit
+        return
+
+    total, rows = import_profile(args.module)
+    print(f"import {args.module}: {total * 1000:.0f} ms cold")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, self_sec, name in rows[:args.top]:
+        print(f"{cumulative * 1000:10.1f}ms {self_sec * 1000:8.1f}ms  {name}")
+
+    completed = subprocess.run(
+        [sys.executable, "-m", "backend.startup", "--steps"], capture_output=True, text=True, env=os.environ.copy()
+    )
+    print("\nwarm-up steps (cold = paid by the first request when warm-up is off):")
+    print(f"{'step':<16} {'cold':>9} {'warm':>9}")
+    for line in completed.stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 4:
+            continue
+        name, cold, warm, error = parts
+        note = f"  failed: {error}" if error else ""
+        print(f"{name:<16} {float(cold) * 1000:7.0f}ms {float(warm) * 1000:7.1f}ms{note}")
+
+
+if __name__ == "__main__":
+    main()
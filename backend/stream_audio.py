@@ -1,30 +1,41 @@
-import sounddevice as sd
-import soundfile as sf
-import numpy as np
-import queue
+import time
+
+from backend.input.ring_capture import RingCapture
+from backend.live_prosody import IncrementalProsodyAnalyzer
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
 # NOTE: Currently overwrites the existing audio file --> change so that we store all audio files for users to listen to
 OUTPUT_FILE = "audiotests/user_recording.wav" 
+FEEDBACK_INTERVAL_SEC = 5.0  # how often to print live coaching while recording
+
+analyzer = IncrementalProsodyAnalyzer(sample_rate=SAMPLE_RATE)
+last_feedback = time.monotonic()
+
+def on_block(block):
+    # Runs on the capture's writer thread, right after the block is written to the file
+    global last_feedback
+    analyzer.push(block)
+    if time.monotonic() - last_feedback >= FEEDBACK_INTERVAL_SEC:
+        last_feedback = time.monotonic()
+        live_assessment = analyzer.assessment()
+        if live_assessment:
+            print(f"[{analyzer.duration_sec:.0f}s] {live_assessment}")
 
-q = queue.Queue()
+# Record until you stop it; the audio callback only copies into a preallocated ring buffer
+capture = RingCapture(OUTPUT_FILE, sample_rate=SAMPLE_RATE, channels=CHANNELS, on_block=on_block)
+with capture:
+    print("Recording... Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nRecording stopped.")
 
-def callback(indata, frames, time, status):
-    if status:
-        print(status)
-    q.put(indata.copy())
+stats = capture.stats()
+if stats["input_overflows"] or stats["dropped_frames"]:
+    print(f"Warning: audio was lost while recording: {stats}")
 
-# Open a stream that runs until you stop it
-with sf.SoundFile(OUTPUT_FILE, mode='w', samplerate=SAMPLE_RATE,
-                  channels=CHANNELS, subtype='PCM_16') as f:
-    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS,
-                        dtype='int16', callback=callback):
-        print("Recording... Press Ctrl+C to stop.")
-        try:
-            while True:
-                f.write(q.get())
-        except KeyboardInterrupt:
-            print("\nRecording stopped.")
 
 
+# RUN COMMAND: python -m backend.stream_audio
@@ -1,25 +1,58 @@
-from modal_parakeet import transcribe_audio
 import os
-import openai
+import time
+from collections import deque
 from dotenv import load_dotenv
+from pathlib import Path
+
+from backend.audio_io import decode_audio_bytes, encode_wav_bytes
+from backend.cache import get_cache, make_key
+from backend.http_clients import get_service, iterate_sync, run_sync
+from backend.longform import LONGFORM_THRESHOLD_SEC, transcribe_long
+from backend.transcription import get_client
+from backend.vad import detect_speech, speech_only
 
 load_dotenv()
 
-# NOTE: Allow for more general [debate form] instead of "public forum" for generalizability
-api_key = os.getenv("OPENROUTER_API_KEY")
-if not api_key:
-    raise ValueError("OPENROUTER_API_KEY not found in environment variables. Please set it in your .env file.")
+def get_api_key() -> str:
+    """
+    The OpenRouter key, validated on first use rather than at import, so the
+    API and the transcription-only paths start without it.
+    """
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise ValueError("OPENROUTER_API_KEY not found in environment variables. Please set it in your .env file.")
+    
+    # Strip whitespace and quotes from API key (handles cases where .env has quotes around the value)
+    api_key = api_key.strip().strip('"').strip("'")
+    
+    if not api_key or len(api_key) < 10:
+        raise ValueError("OPENROUTER_API_KEY appears to be invalid (too short or empty). Please check your .env file.")
+    return api_key
+
+_llm_client = None
 
-# Strip whitespace and quotes from API key (handles cases where .env has quotes around the value)
-api_key = api_key.strip().strip('"').strip("'")
+def get_llm_client():
+    """Async OpenRouter client on the shared "openrouter" connection pool (created on first use)."""
+    global _llm_client
+    if _llm_client is None:
+        import openai  # the SDK takes a while to import; pay for it on first use or in warm-up
 
-if not api_key or len(api_key) < 10:
-    raise ValueError("OPENROUTER_API_KEY appears to be invalid (too short or empty). Please check your .env file.")
+        # OPENROUTER_BASE_URL can point at any OpenAI-compatible server (e.g. the local stub in benchmarks/)
+        _llm_client = openai.AsyncOpenAI(
+            base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+            api_key=get_api_key(),
+            http_client=get_service("openrouter").client,
+            max_retries=0,  # http_clients retries with jittered backoff
+        )
+    return _llm_client
 
-client = openai.OpenAI(
-  base_url="https://openrouter.ai/api/v1",
-  api_key=api_key,
-)
+FEEDBACK_MODEL = "openai/gpt-5"
+# What get_transcript sends to the ASR backend; part of the transcript cache key
+TRANSCRIBE_INPUT = "speech-only-v1"
+
+# Time-to-first-token and tokens/sec of recent streamed feedback requests
+FEEDBACK_STREAM_METRICS = deque(maxlen=200)
+# NOTE: Allow for more general [debate form] instead of "public forum" for generalizability
 SYSTEM_PROMPT = """You are a debate team coach specializing in policy debate. 
 Analyze the user's speech on its content, structure, argumentation, grammar, and style. 
 Provide detailed feedback on each aspect, including specific examples from the speech. 
@@ -30,33 +63,80 @@ DO NOT be verbose in your response. Keep it concise and to the point, while prov
 Be HONEST, balancing constructive criticism with kind support.
 Return your response as a text string with all this information."""
 
-def get_transcript(file_path: str = "audiotests/user_recording.wav"):
-    return transcribe_audio(file_path)
+def transcript_key(wav_bytes: bytes, asr_client=None):
+    """Content hash identifying a transcript: audio bytes + ASR backend + model revision + input trimming."""
+    backend = (asr_client or get_client()).backend
+    return make_key(wav_bytes, backend.name, getattr(backend, "model_id", ""), TRANSCRIBE_INPUT)
+
+def get_transcript(audio="audiotests/user_recording.wav", decoded=None, speech=None):
+    """
+    Transcribe a WAV file path, or WAV bytes that are already in memory.
+
+    Only the speech is sent: leading/trailing silence is cut and long pauses are
+    shortened (see backend.vad). Pass `decoded` and `speech` when the caller has
+    already decoded the audio and run the VAD, so neither happens twice.
+    """
+    wav_bytes = bytes(audio) if isinstance(audio, (bytes, bytearray)) else Path(audio).read_bytes()
+    asr_client = get_client()
+    cache = get_cache("transcripts")
+    key = transcript_key(wav_bytes, asr_client)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return cached["text"]
+
+    try:
+        decoded = decoded or decode_audio_bytes(wav_bytes)
+    except Exception as e:
+        print(f"Could not decode audio for speech detection, sending it as is: {e}")
+        decoded = None
+    if decoded is not None:
+        speech = speech or detect_speech(decoded.samples, decoded.sample_rate)
+        trimmed = speech_only(decoded, speech)
+        payload = wav_bytes if trimmed is decoded else encode_wav_bytes(trimmed.samples, trimmed.sample_rate)
+        duration = trimmed.duration_sec
+    else:
+        trimmed, payload, duration = wav_bytes, wav_bytes, None
+
+    # Long speeches are split at pauses and transcribed as concurrent chunks
+    if duration is not None and duration > LONGFORM_THRESHOLD_SEC:
+        result = transcribe_long(trimmed, client=asr_client)
+    else:
+        result = asr_client.transcribe_bytes(payload)
+    # Don't cache empty or partial transcripts; a retry may do better
+    if cache and result.text and not result.failed_chunks:
+        cache.set(key, {"text": result.text, "chunks": result.chunks})
+    return result.text
+
+async def get_feedback_async(transcript: str):
+    """Feedback on a transcript in one response (cached by transcript, prompt and model)."""
+    import openai
 
-def get_feedback_from_transcript(transcript: str):
     # Pass transcribed output to ChatGPT 5.1 for some feedback on speech content, structure, and style
     print("Calling ChatGPT 5 for feedback...")
     
-    # Verify API key is set
-    if not api_key:
-        raise ValueError("OPENROUTER_API_KEY not found in environment variables. Please set it in your .env file.")
+    cache = get_cache("feedback")
+    key = make_key(transcript, SYSTEM_PROMPT, FEEDBACK_MODEL)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return cached["feedback"]
     
     try:
-        response = client.chat.completions.create(
-            model="openai/gpt-5",
-            messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": transcript}
-            ]
+        response = await get_service("openrouter").call(
+            lambda: get_llm_client().chat.completions.create(
+                model=FEEDBACK_MODEL,
+                messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": transcript}
+                ]
+            ),
+            retry_on=(openai.APIConnectionError,),
         )
-        return response.choices[0].message.content
+        feedback = response.choices[0].message.content
+        if cache and feedback:
+            cache.set(key, {"feedback": feedback})
+        return feedback
     except openai.AuthenticationError as e:
-        error_msg = str(e)
-        print(f"Authentication error: {error_msg}")
-        if "User not found" in error_msg:
-            raise ValueError("Invalid OPENROUTER_API_KEY. The API key may be expired or incorrect. Please check your .env file and verify the key at https://openrouter.ai/keys")
-        else:
-            raise ValueError(f"Authentication failed: {error_msg}. Please check your OPENROUTER_API_KEY in the .env file.")
+        raise _authentication_error(e)
     except openai.APIError as e:
         print(f"API error: {e}")
         raise
@@ -64,11 +144,112 @@ def get_feedback_from_transcript(transcript: str):
         print(f"Error getting feedback from GPT: {e}")
         raise
 
+def get_feedback_from_transcript(transcript: str):
+    """Blocking wrapper around get_feedback_async for worker threads."""
+    return run_sync(get_feedback_async(transcript))
+
+def _authentication_error(e):
+    error_msg = str(e)
+    print(f"Authentication error: {error_msg}")
+    if "User not found" in error_msg:
+        return ValueError("Invalid OPENROUTER_API_KEY. The API key may be expired or incorrect. Please check your .env file and verify the key at https://openrouter.ai/keys")
+    return ValueError(f"Authentication failed: {error_msg}. Please check your OPENROUTER_API_KEY in the .env file.")
+
+async def stream_feedback_async(transcript: str, metrics: dict = None):
+    """
+    Yield feedback text as the model generates it.
+
+    Opening the stream is retried under the "openrouter" policy; once text has
+    been yielded it is not, so the caller never sees a reply twice. The stream
+    holds one of the service's concurrency slots until it ends.
+
+    Args:
+        transcript: Speech transcript to get feedback on
+        metrics: Optional dict filled in with ttft_sec, tokens, elapsed_sec and tokens_per_sec
+            once the stream finishes (also appended to FEEDBACK_STREAM_METRICS)
+    """
+    import openai
+
+    metrics = metrics if metrics is not None else {}
+    start = time.perf_counter()
+    
+    cache = get_cache("feedback")
+    key = make_key(transcript, SYSTEM_PROMPT, FEEDBACK_MODEL)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        metrics.update(cached=True, ttft_sec=time.perf_counter() - start, tokens=0, elapsed_sec=time.perf_counter() - start, tokens_per_sec=None)
+        yield cached["feedback"]
+        return
+    
+    print("Streaming ChatGPT 5 feedback...")
+    parts = []
+    ttft = None
+    usage_tokens = None
+    content_chunks = 0
+    service = get_service("openrouter")
+    try:
+        async with service.slot():
+            response = await service.call(
+                lambda: get_llm_client().chat.completions.create(
+                    model=FEEDBACK_MODEL,
+                    messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": transcript}
+                    ],
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                retry_on=(openai.APIConnectionError,),
+                limit=False,
+            )
+            # Closing the stream returns its connection to the pool, even if the listener left early
+            async with response:
+                async for chunk in response:
+                    if chunk.usage is not None:
+                        usage_tokens = chunk.usage.completion_tokens
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        content_chunks += 1
+                        parts.append(delta)
+                        yield delta
+    except openai.AuthenticationError as e:
+        raise _authentication_error(e)
+    except openai.APIError as e:
+        print(f"API error: {e}")
+        raise
+    
+    elapsed = time.perf_counter() - start
+    # Providers that don't report usage in the stream send roughly one token per chunk
+    tokens = usage_tokens if usage_tokens is not None else content_chunks
+    generation_sec = elapsed - (ttft or 0.0)
+    metrics.update(
+        cached=False,
+        ttft_sec=ttft,
+        tokens=tokens,
+        elapsed_sec=elapsed,
+        tokens_per_sec=tokens / generation_sec if generation_sec > 0 else None,
+    )
+    FEEDBACK_STREAM_METRICS.append(dict(metrics))
+    print(f"Feedback streamed: TTFT {ttft or 0:.2f}s, {tokens} tokens in {elapsed:.2f}s")
+    
+    feedback = "".join(parts)
+    if cache and feedback:
+        cache.set(key, {"feedback": feedback})
+
+def stream_feedback_from_transcript(transcript: str, metrics: dict = None):
+    """Blocking iterator over stream_feedback_async for worker threads (same arguments)."""
+    yield from iterate_sync(stream_feedback_async(transcript, metrics))
+
 # Test function - only runs if script is executed directly
 if __name__ == "__main__":
     test_transcript = "Climate change is a serious issue that needs to be addressed. We need to take action now, by encouraging our politicians to pursue policies that reduce greenhouse gas emissions and promote sustainable practices."
     
     # Check API key format
+    api_key = os.getenv("OPENROUTER_API_KEY", "").strip().strip('"').strip("'")
     print(f"API Key loaded: {'Yes' if api_key else 'No'}")
     if api_key:
         print(f"API Key length: {len(api_key)}")
@@ -95,7 +276,7 @@ if __name__ == "__main__":
         print("\nThis might be a temporary API issue. Try again later.")
 
 def get_feedback(audio_file):
-    """Get transcript and feedback from audio file. Returns [transcript, feedback]."""
+    """Get transcript and feedback from an audio file path or WAV bytes. Returns [transcript, feedback]."""
     transcript = get_transcript(audio_file)
     gpt5_feedback = get_feedback_from_transcript(transcript)
     return [transcript, gpt5_feedback]
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Long-lived transcription client for the Flask API.
+
+One client per process holds a single handle to the deployed
+`modal_parakeet.Model` (deploy it with `modal deploy backend/modal_parakeet.py`)
+and runs calls on a small worker pool. The backend is pluggable so the API can
+run offline against a stub or a CPU Whisper model:
+
+    SPEAKEASY_ASR_BACKEND=modal|local|stub
+    SPEAKEASY_ASR_WORKERS=4
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+MODAL_APP_NAME = "example-batched-whisper"
+MODAL_CLASS_NAME = "Model"
+# Keep in sync with modal_parakeet.MODEL_NAME / MODEL_REVISION; part of the transcript cache key
+MODAL_MODEL_ID = "openai/whisper-large-v3@afda370583db9c5359511ed5d989400a6199dfe1"
+LOCAL_MODEL_NAME = "openai/whisper-tiny.en"
+
+
+@dataclass
+class TranscriptionResult:
+    """Structured transcription output, independent of the backend that produced it."""
+    text: str
+    chunks: list = field(default_factory=list)  # [{"text": str, "timestamp": (start, end)}]
+    backend: str = ""
+    elapsed_sec: float = 0.0
+    failed_chunks: list = field(default_factory=list)  # long-form only: [(start_sec, end_sec)] that never transcribed
+
+    def to_dict(self):
+        return {
+            "text": self.text,
+            "chunks": self.chunks,
+            "backend": self.backend,
+            "elapsed_sec": self.elapsed_sec,
+            "failed_chunks": self.failed_chunks,
+        }
+
+
+class ModalBackend:
+    """Calls `Model.transcribe_bytes` on the deployed Modal app, reusing one handle."""
+    name = "modal"
+    model_id = MODAL_MODEL_ID
+
+    def __init__(self, app_name: str = MODAL_APP_NAME, class_name: str = MODAL_CLASS_NAME):
+        self.app_name = app_name
+        self.class_name = class_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import modal
+
+                    model_cls = modal.Cls.from_name(self.app_name, self.class_name)
+                    self._model = model_cls()
+        return self._model
+
+    def transcribe(self, wav_bytes: bytes, return_timestamps: bool = False) -> dict:
+        return self._get_model().transcribe_bytes.remote(wav_bytes, return_timestamps=return_timestamps)
+
+
+class LocalWhisperBackend:
+    """Runs a small Whisper checkpoint on CPU through the transformers pipeline."""
+    name = "local"
+
+    def __init__(self, model_name: str = LOCAL_MODEL_NAME):
+        self.model_name = model_name
+        self.model_id = model_name
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def _get_pipeline(self):
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    from transformers import pipeline
+
+                    self._pipeline = pipeline("automatic-speech-recognition", model=self.model_name, device="cpu")
+        return self._pipeline
+
+    def transcribe(self, wav_bytes: bytes, return_timestamps: bool = False) -> dict:
+        pipeline = self._get_pipeline()  # loads under self._lock, so it must run before we take it
+        with self._lock:  # the pipeline is not safe to call from several threads at once
+            return pipeline(wav_bytes, return_timestamps=return_timestamps)
+
+
+class StubBackend:
+    """Offline backend that returns a canned transcript after an optional delay."""
+    name = "stub"
+    model_id = "stub"
+
+    def __init__(self, text: str = "This is a stub transcript.", delay_sec: float = 0.0):
+        self.text = text
+        self.delay_sec = delay_sec
+        self.calls = 0
+
+    def transcribe(self, wav_bytes: bytes, return_timestamps: bool = False) -> dict:
+        self.calls += 1
+        if self.delay_sec:
+            time.sleep(self.delay_sec)
+        return {"text": self.text, "chunks": []}
+
+
+BACKENDS = {
+    ModalBackend.name: ModalBackend,
+    LocalWhisperBackend.name: LocalWhisperBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+class TranscriptionClient:
+    """
+    Thread pool in front of a transcription backend.
+
+    Args:
+        backend: Object with a `transcribe(wav_bytes, return_timestamps=False) -> dict` method (default: ModalBackend)
+        max_workers: Number of transcriptions that may be in flight at once
+    """
+
+    def __init__(self, backend=None, max_workers: int = 4):
+        self.backend = backend if backend is not None else ModalBackend()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asr")
+
+    def _run(self, wav_bytes: bytes, return_timestamps: bool = False) -> TranscriptionResult:
+        start = time.perf_counter()
+        output = self.backend.transcribe(wav_bytes, return_timestamps=return_timestamps)
+        if isinstance(output, str):
+            output = {"text": output}
+        return TranscriptionResult(
+            text=(output.get("text") or "").strip(),
+            chunks=list(output.get("chunks") or []),
+            backend=getattr(self.backend, "name", type(self.backend).__name__),
+            elapsed_sec=time.perf_counter() - start,
+        )
+
+    def submit(self, wav_bytes: bytes, return_timestamps: bool = False) -> Future:
+        """Queue a transcription and return a Future resolving to a TranscriptionResult."""
+        return self._executor.submit(self._run, wav_bytes, return_timestamps)
+
+    def transcribe_bytes(self, wav_bytes: bytes, timeout: Optional[float] = None) -> TranscriptionResult:
+        return self.submit(wav_bytes).result(timeout=timeout)
+
+    def warm_up(self):
+        """Load the backend's model handle or pipeline now instead of on the first transcription."""
+        loader = getattr(self.backend, "_get_model", None) or getattr(self.backend, "_get_pipeline", None)
+        if loader is not None:
+            loader()
+
+    def transcribe_file(self, file_path, timeout: Optional[float] = None) -> TranscriptionResult:
+        return self.transcribe_bytes(Path(file_path).read_bytes(), timeout=timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> TranscriptionClient:
+    """Process-wide TranscriptionClient, configured from the environment on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                backend_name = os.getenv("SPEAKEASY_ASR_BACKEND", ModalBackend.name)
+                if backend_name not in BACKENDS:
+                    raise ValueError(f"Unknown SPEAKEASY_ASR_BACKEND '{backend_name}'. Choose one of: {', '.join(BACKENDS)}")
+                workers = int(os.getenv("SPEAKEASY_ASR_WORKERS", "4"))
+                _client = TranscriptionClient(BACKENDS[backend_name](), max_workers=workers)
+    return _client
@@ -0,0 +1,280 @@
+"""
+Sentence-streaming text-to-speech for spoken feedback.
+
+Feedback text is split into sentences, a few sentences are synthesized at a
+time on a thread pool, and the audio is yielded strictly in sentence order.
+Playback can therefore start as soon as the first sentence is ready instead
+of after the whole reply. Clips are kept in an in-memory LRU keyed by
+everything that determines the audio, so repeated phrases ("Great job!",
+canned tips) are never synthesized twice. The backend is pluggable:
+
+    SPEAKEASY_TTS_BACKEND=elevenlabs|fake
+    SPEAKEASY_TTS_PARALLEL=3
+    SPEAKEASY_TTS_CACHE_MB=32
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from backend.cache import make_key
+
+DEFAULT_VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
+DEFAULT_MODEL_ID = "eleven_multilingual_v2"
+DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
+DEFAULT_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.75, "style": 0.0, "use_speaker_boost": True}
+
+MIN_SENTENCE_CHARS = 20  # shorter fragments ride along with the next sentence
+MAX_SENTENCE_CHARS = 300  # longer sentences are split at commas/semicolons
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[.!?][\"')\]])\s+|\n+")
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS, max_chars: int = MAX_SENTENCE_CHARS) -> List[str]:
+    """Split text into speakable pieces: sentences, merged when tiny and cut at clauses when huge."""
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            # Prefer the last clause break, then the last space, before the limit
+            window = sentence[:max_chars]
+            cut = max(window.rfind(", "), window.rfind("; "), window.rfind(": "))
+            cut = cut + 1 if cut > 0 else window.rfind(" ")
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    merged = []
+    for piece in pieces:
+        if merged and len(merged[-1]) < min_chars:
+            merged[-1] = f"{merged[-1]} {piece}"
+        else:
+            merged.append(piece)
+    return merged
+
+
+def output_mimetype(output_format: str) -> str:
+    """HTTP content type for an ElevenLabs output format name."""
+    codec, _, rest = output_format.partition("_")
+    if codec == "mp3":
+        return "audio/mpeg"
+    if codec == "pcm":
+        return f"audio/L16;rate={rest.split('_')[0]};channels=1"
+    if codec == "ulaw":
+        return "audio/basic"
+    return "application/octet-stream"
+
+
+class ElevenLabsBackend:
+    """Synthesizes one clip per call through tts_elevenlabs, on the shared "elevenlabs" connection pool."""
+    name = "elevenlabs"
+
+    def synthesize(self, text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str) -> bytes:
+        from backend.http_clients import run_sync
+        from backend.tts_elevenlabs import synthesize_async
+
+        return run_sync(synthesize_async(text, voice_id, model_id, voice_settings, output_format))
+
+
+class FakeTTSBackend:
+    """
+    Offline backend for tests and benchmarks.
+
+    Returns 16-bit PCM tones (one pitch per text, length proportional to the
+    text) after a latency of `first_byte_delay + char_delay * len(text)`. The
+    output is PCM whatever `output_format` asks for; only the sample rate of a
+    pcm_* format is honoured.
+    """
+    name = "fake"
+
+    def __init__(self, first_byte_delay: float = 0.3, char_delay: float = 0.004, sec_per_char: float = 0.06):
+        self.first_byte_delay = first_byte_delay
+        self.char_delay = char_delay
+        self.sec_per_char = sec_per_char
+        self.calls = 0
+
+    def synthesize(self, text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str) -> bytes:
+        self.calls += 1
+        time.sleep(self.first_byte_delay + self.char_delay * len(text))
+        codec, _, rest = output_format.partition("_")
+        sample_rate = int(rest.split("_")[0]) if codec == "pcm" else 16000
+        t = np.arange(int(len(text) * self.sec_per_char * sample_rate)) / sample_rate
+        frequency = 200 + int(make_key(text)[:4], 16) % 400
+        return (0.2 * 32767 * np.sin(2 * np.pi * frequency * t)).astype("<i2").tobytes()
+
+
+BACKENDS = {
+    ElevenLabsBackend.name: ElevenLabsBackend,
+    FakeTTSBackend.name: FakeTTSBackend,
+}
+
+
+class PhraseCache:
+    """Thread-safe in-memory LRU of synthesized clips, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clips = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            clip = self._clips.get(key)
+            if clip is None:
+                self.misses += 1
+                return None
+            self._clips.move_to_end(key)
+            self.hits += 1
+            return clip
+
+    def set(self, key: str, clip: bytes):
+        if len(clip) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._clips.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous)
+            self._clips[key] = clip
+            self._total_bytes += len(clip)
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._clips.popitem(last=False)
+                self._total_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._clips),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class TTSEngine:
+    """
+    Ordered, bounded-parallel sentence synthesis in front of a TTS backend.
+
+    Args:
+        backend: Object with `synthesize(text, voice_id, model_id, voice_settings, output_format) -> bytes`
+            (default: ElevenLabsBackend)
+        max_parallel: Sentences synthesized ahead of the one being played, per stream
+        cache: PhraseCache for clips (None disables caching)
+        max_workers: Pool size shared by all concurrent streams
+    """
+
+    def __init__(self, backend=None, max_parallel: int = 3, cache: Optional[PhraseCache] = None, max_workers: int = 8):
+        self.backend = backend if backend is not None else ElevenLabsBackend()
+        self.max_parallel = max_parallel
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+
+    def clip_key(self, text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str) -> str:
+        return make_key(
+            self.backend.name, text, voice_id, model_id, json.dumps(voice_settings, sort_keys=True), output_format
+        )
+
+    def _synthesize(self, key: str, text: str, voice_id, model_id, voice_settings, output_format) -> bytes:
+        clip = self.backend.synthesize(text, voice_id, model_id, voice_settings, output_format)
+        if self.cache is not None and clip:
+            self.cache.set(key, clip)
+        return clip
+
+    def _submit(self, text: str, voice_id, model_id, voice_settings, output_format, metrics: dict) -> Future:
+        key = self.clip_key(text, voice_id, model_id, voice_settings, output_format)
+        clip = self.cache.get(key) if self.cache is not None else None
+        if clip is not None:
+            metrics["cache_hits"] += 1
+            future = Future()
+            future.set_result(clip)
+            return future
+        return self._executor.submit(self._synthesize, key, text, voice_id, model_id, voice_settings, output_format)
+
+    def stream(
+        self,
+        text: str,
+        voice_id: str = DEFAULT_VOICE_ID,
+        model_id: str = DEFAULT_MODEL_ID,
+        voice_settings: Optional[dict] = None,
+        output_format: str = DEFAULT_OUTPUT_FORMAT,
+        metrics: Optional[dict] = None,
+    ) -> Iterator[bytes]:
+        """
+        Yield one audio clip per sentence, in order, as soon as each is ready.
+
+        Args:
+            text: Text to speak
+            voice_id, model_id, voice_settings, output_format: Passed to the backend (and part of the cache key)
+            metrics: Optional dict filled with sentences, cache_hits, ttfa_sec (time to first audio) and elapsed_sec
+        """
+        metrics = metrics if metrics is not None else {}
+        voice_settings = {**DEFAULT_VOICE_SETTINGS, **(voice_settings or {})}
+        sentences = split_sentences(text)
+        metrics.update(sentences=len(sentences), cache_hits=0, ttfa_sec=None)
+        start = time.perf_counter()
+
+        in_flight = deque()
+        next_index = 0
+        try:
+            while next_index < len(sentences) or in_flight:
+                # Keep up to max_parallel sentences synthesizing ahead of playback
+                while next_index < len(sentences) and len(in_flight) < self.max_parallel:
+                    in_flight.append(self._submit(sentences[next_index], voice_id, model_id, voice_settings, output_format, metrics))
+                    next_index += 1
+                clip = in_flight.popleft().result()
+                if metrics["ttfa_sec"] is None:
+                    metrics["ttfa_sec"] = time.perf_counter() - start
+                if clip:
+                    yield clip
+        finally:
+            # The listener went away: don't pay for sentences nobody will hear
+            for future in in_flight:
+                future.cancel()
+            metrics["elapsed_sec"] = time.perf_counter() - start
+
+    def synthesize(self, text: str, **kwargs) -> bytes:
+        """The whole text as one clip (sentences synthesized in parallel, joined in order)."""
+        return b"".join(self.stream(text, **kwargs))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> TTSEngine:
+    """Process-wide TTSEngine, configured from the environment on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                backend_name = os.getenv("SPEAKEASY_TTS_BACKEND", ElevenLabsBackend.name)
+                if backend_name not in BACKENDS:
+                    raise ValueError(f"Unknown SPEAKEASY_TTS_BACKEND '{backend_name}'. Choose one of: {', '.join(BACKENDS)}")
+                cache_mb = float(os.getenv("SPEAKEASY_TTS_CACHE_MB", "32"))
+                _engine = TTSEngine(
+                    BACKENDS[backend_name](),
+                    max_parallel=int(os.getenv("SPEAKEASY_TTS_PARALLEL", "3")),
+                    cache=PhraseCache(int(cache_mb * 1024 * 1024)) if cache_mb > 0 else None,
+                )
+    return _engine
@@ -4,16 +4,65 @@
 # - style (0.0-1.0): Style exaggeration - higher values = more expressive intonation
 # - use_speaker_boost: Enhances similarity to the original speaker
 
-from elevenlabs import ElevenLabs
+from elevenlabs import AsyncElevenLabs
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 
+from backend.http_clients import get_service, iterate_sync, run_sync
+
 load_dotenv()
 
-client = ElevenLabs(
-    api_key=os.getenv("ELEVENLABS_API_KEY"),
-)
+# Longest text hedged when SPEAKEASY_HTTP_ELEVENLABS_HEDGE_SEC enables hedging;
+# a duplicate is billed per character, so only short phrases are worth it
+HEDGE_MAX_CHARS = 80
+
+_client = None
+
+
+def get_client():
+    """Async ElevenLabs client on the shared "elevenlabs" connection pool (created on first use)."""
+    global _client
+    if _client is None:
+        _client = AsyncElevenLabs(
+            api_key=os.getenv("ELEVENLABS_API_KEY"),
+            httpx_client=get_service("elevenlabs").client,
+        )
+    return _client
+
+
+async def synthesize_async(text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str) -> bytes:
+    """
+    One whole clip, retried under the "elevenlabs" policy; that is safe because
+    the clip is only returned once it is complete. If the policy enables hedging,
+    only texts up to HEDGE_MAX_CHARS are hedged, since a duplicate is billed per character.
+    """
+    async def attempt():
+        audio = get_client().text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+            voice_settings=voice_settings,
+        )
+        return b"".join([chunk async for chunk in audio if chunk])
+
+    return await get_service("elevenlabs").call(attempt, hedge=len(text) <= HEDGE_MAX_CHARS)
+
+
+async def stream_async(text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str):
+    """Yield audio chunks as they arrive. Not retried: a retry would repeat audio already played."""
+    service = get_service("elevenlabs")
+    async with service.slot():
+        async for chunk in get_client().text_to_speech.stream(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+            voice_settings=voice_settings,
+        ):
+            if chunk:
+                yield chunk
 
 
 def generate_speech_to_file(
@@ -48,25 +97,23 @@ def generate_speech_to_file(
     output_dir = Path(output_path).parent
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Generate audio using the generate method (better for file saving)
-    audio = client.text_to_speech.generate(
-        text=text,
-        voice=voice_id,
-        model=model_id,
-        output_format=output_format,
+    # Generate the whole clip first (retried on failure), then save it
+    audio = run_sync(synthesize_async(
+        text,
+        voice_id,
+        model_id,
         voice_settings={
             "stability": stability,
             "similarity_boost": similarity_boost,
             "style": style,
             "use_speaker_boost": use_speaker_boost
-        }
-    )
+        },
+        output_format=output_format,
+    ))
     
     # Save audio to file
     with open(output_path, "wb") as f:
-        for chunk in audio:
-            if chunk:
-                f.write(chunk)
+        f.write(audio)
     
     print(f"Audio saved to: {output_path}")
     return output_path
@@ -80,7 +127,8 @@ def generate_speech_stream_to_file(
     stability: float = 0.5,
     similarity_boost: float = 0.75,
     style: float = 0.0,
-    use_speaker_boost: bool = True
+    use_speaker_boost: bool = True,
+    output_format: str = "mp3_44100_128"
 ):
     """
     Generate speech using streaming API and save to file (alternative method).
@@ -95,6 +143,7 @@ def generate_speech_stream_to_file(
         similarity_boost: Similarity to original voice (0.0-1.0)
         style: Style exaggeration (0.0-1.0)
         use_speaker_boost: Enhance similarity to the original speaker
+        output_format: Audio format (see generate_speech_to_file)
     
     Returns:
         Path to the saved audio file
@@ -104,23 +153,23 @@ def generate_speech_stream_to_file(
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Generate audio stream with voice settings
-    audio_stream = client.text_to_speech.stream(
-        text=text,
-        voice_id=voice_id,
-        model_id=model_id,
+    audio_stream = stream_async(
+        text,
+        voice_id,
+        model_id,
         voice_settings={
             "stability": stability,
             "similarity_boost": similarity_boost,
             "style": style,
             "use_speaker_boost": use_speaker_boost
-        }
+        },
+        output_format=output_format,
     )
     
-    # Collect audio chunks and save to file
+    # Write audio chunks to the file as they arrive
     with open(output_path, "wb") as f:
-        for chunk in audio_stream:
-            if chunk:
-                f.write(chunk)
+        for chunk in iterate_sync(audio_stream):
+            f.write(chunk)
     
     print(f"Audio saved to: {output_path}")
     return output_path
@@ -19,6 +19,8 @@ import {
 import { Button } from '@/components/ui/button';
 import { Avatar, AvatarFallback } from '@/components/ui/avatar';
 
+const API_BASE_URL = 'http://localhost:5000';
+
 export default function Dashboard() {
   const [isRecording, setIsRecording] = useState(false);
   const [duration, setDuration] = useState(0);
@@ -157,7 +159,7 @@ export default function Dashboard() {
           formData.append('audio', wavBlob, 'recording.wav');
           
           try {
-            const response = await fetch('http://localhost:5000/api/upload-audio', {
+            const response = await fetch(`${API_BASE_URL}/api/upload-audio`, {
               method: 'POST',
               body: formData,
             });
@@ -165,21 +167,38 @@ export default function Dashboard() {
             if (response.ok) {
               const result = await response.json();
               console.log('WAV file saved:', result.message);
-              
-              // Update filename, transcript, and feedback
               setAudioFilename(result.filename);
-              setTranscript(result.transcript || null);
-              setFeedback(result.feedback || null);
               
-              // Show transcription status
-              setIsTranscribing(false);
-              if (result.feedback) {
+              // Transcription and feedback run as a background job; follow its event stream
+              const events = new EventSource(`${API_BASE_URL}${result.events_url}`);
+              events.addEventListener('transcript', (e) => {
+                const data = JSON.parse((e as MessageEvent).data);
+                setTranscript(data.transcript || null);
+                setIsTranscribing(false);
+                console.log('Transcript received:', data.transcript);
+              });
+              events.addEventListener('feedback_delta', (e) => {
+                const data = JSON.parse((e as MessageEvent).data);
+                setFeedback(prev => (prev || '') + data.text);
+              });
+              events.addEventListener('feedback', (e) => {
+                const data = JSON.parse((e as MessageEvent).data);
+                setFeedback(data.feedback || null);
                 console.log('Feedback received');
-              } else if (result.transcript) {
-                console.log('Transcript received:', result.transcript);
-              } else {
-                console.log('No transcript or feedback available');
-              }
+              });
+              events.addEventListener('done', () => {
+                setIsTranscribing(false);
+                events.close();
+              });
+              events.addEventListener('error', (e) => {
+                const data = (e as MessageEvent).data;
+                if (data) {
+                  setIsTranscribing(false);
+                  console.error('Error processing audio:', JSON.parse(data).error);
+                  events.close();
+                }
+                // Without data this is a dropped connection; EventSource reconnects on its own
+              });
             } else {
               setIsTranscribing(false);
               const error = await response.json();